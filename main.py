@@ -33,7 +33,8 @@ def main(channel_url: str,
          fetch_titles: bool = False,
          skip_vector: bool = False,
          vector_clusters: int = 4,
-         use_sbert: bool = False):
+         use_sbert: bool = False,
+         compile_model: bool = None):
     """
     Run the complete analysis pipeline.
 
@@ -45,6 +46,7 @@ def main(channel_url: str,
         skip_vector: Skip vector pipeline step
         vector_clusters: Number of clusters for KMeans (default 4)
         use_sbert: Use Sentence-BERT for Stage 2 vectorization
+        compile_model: torch.compile the sentiment model (None: only when CUDA is available)
     """
     print("=" * 60)
     print("AI-Generated Video Comment Analysis")
@@ -59,7 +61,7 @@ def main(channel_url: str,
         print("-" * 40)
         collector = YouTubeCommentCollector(
             channel_url=channel_url,
-            output_dir="data/raw_json",
+            output_dir="data/raw_parquet",
             progress_dir="data/progress",
             log_dir="logs"
         )
@@ -77,7 +79,7 @@ def main(channel_url: str,
         print("-" * 40)
         collector = YouTubeCommentCollector(
             channel_url=channel_url,
-            output_dir="data/raw_json",
+            output_dir="data/raw_parquet",
             progress_dir="data/progress",
             log_dir="logs"
         )
@@ -87,9 +89,10 @@ def main(channel_url: str,
     print("\n[Step 2/4] Processing and cleaning data...")
     print("-" * 40)
     processor = CommentProcessor(
-        raw_dir="data/raw_json",
-        output_path="data/merged_data.csv",
-        log_dir="logs"
+        raw_dir="data/raw_parquet",
+        output_path="data/cleaned_data.parquet",
+        log_dir="logs",
+        legacy_json_dir="data/raw_json"
     )
     df = processor.run()
 
@@ -102,10 +105,11 @@ def main(channel_url: str,
         print("\n[Step 3/4] Analyzing sentiment and linguistic complexity...")
         print("-" * 40)
         analyzer = CommentAnalyzer(
-            input_path="data/merged_data.csv",
-            output_path="data/merged_data.csv",
+            input_path="data/cleaned_data.parquet",
+            output_path="data/merged_data.parquet",
             log_dir="logs",
-            batch_size=32
+            batch_size=32,
+            compile_model=compile_model
         )
         df = analyzer.run()
     else:
@@ -115,7 +119,7 @@ def main(channel_url: str,
     print("\n[Step 4/4] Generating visualizations...")
     print("-" * 40)
     visualizer = CommentVisualizer(
-        input_path="data/merged_data.csv",
+        input_path="data/merged_data.parquet",
         output_dir="output",
         log_dir="logs"
     )
@@ -126,7 +130,7 @@ def main(channel_url: str,
         print("\n[Step 5/6] Running vector semantic pipeline...")
         print("-" * 40)
         df_vec, wv, cluster_terms, km = run_vector_pipeline(
-            csv_path="data/merged_data.csv",
+            csv_path="data/merged_data.parquet",
             n_clusters=vector_clusters,
             use_sbert=use_sbert,
         )
@@ -147,7 +151,8 @@ def main(channel_url: str,
     print("Analysis Complete!")
     print("=" * 60)
     print("\nOutput files:")
-    print("  - Data: data/merged_data.csv")
+    print("  - Cleaned data: data/cleaned_data.parquet")
+    print("  - Analyzed data: data/merged_data.parquet")
     print("  - Vector clusters: data/vector_clusters.csv")
     print("  - Cluster terms: data/cluster_top_terms.csv")
     print("  - Charts (PNG): output/png/")
@@ -215,6 +220,14 @@ Examples:
         help="Use Sentence-BERT for Stage 2 vectorization"
     )
 
+    parser.add_argument(
+        "--compile",
+        dest="compile_model",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="torch.compile the sentiment model (default: only when CUDA is available)"
+    )
+
     parser.add_argument(
         "--fetch-titles",
         action="store_true",
@@ -232,4 +245,5 @@ Examples:
         skip_vector=args.skip_vector,
         vector_clusters=args.vector_clusters,
         use_sbert=args.sbert,
+        compile_model=args.compile_model,
     )
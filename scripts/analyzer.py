@@ -1,88 +1,423 @@
 """
 Analysis Module - Sentiment and Linguistic Complexity Analyzer
 
-Analyzes comments using DistilBERT for sentiment and textstat for linguistic complexity.
+Analyzes comments using DistilBERT for sentiment and regex-based readability metrics
+(lexical density, Flesch reading ease) for linguistic complexity.
+On GPU the model runs in BF16 (FP16 where BF16 is unsupported); on CPU it is int8-quantized,
+served with ONNX Runtime when optimum is installed and PyTorch dynamic quantization otherwise.
 """
 
-import logging
+import hashlib
+import os
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
 from pathlib import Path
-from datetime import datetime
 
+import numpy as np
 import pandas as pd
-import textstat
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 from tqdm import tqdm
 
 # Transformers imports
-from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import torch
 
+try:
+    from numba import njit, prange
+except ImportError:
+    # Optional: without numba the pandas string kernels compute complexity
+    njit = prange = None
+
+from logging_setup import setup_stage_logger
+
+
+# Patterns for the vectorized complexity pass (compiled once per process)
+_WORD_CHAR_RE = re.compile(r"[\w'’]")
+_WORD_RE = re.compile(_WORD_CHAR_RE.pattern + "+")
+_SYLLABLE_RE = re.compile(r"[aeiouy]+")
+_SENTENCE_RE = re.compile(r"[.!?]+")
+
+# Comments without a word of three or more letters (once links and @mentions are
+# removed) carry no signal for the model and get a heuristic label instead
+_LINK_MENTION_RE = re.compile(r"https?://\S+|www\.\S+|@\S+")
+_SIGNAL_RE = re.compile(r"[a-z]{3,}")
+_POSITIVE_EMOJI_RE = re.compile("[\U0001F44D\u2764\U0001F60D\U0001F525]")  # 👍 ❤ 😍 🔥
+_NEGATIVE_EMOJI_RE = re.compile("[\U0001F44E\U0001F621\U0001F92E]")  # 👎 😡 🤮
+_HEURISTIC_SCORE = 0.5
+
+# Text columns (votes/replies are display strings like "1.2K") never type-inferred by the Arrow CSV reader
+_STRING_COLUMNS = ['video_id', 'text', 'votes', 'replies', 'time', 'author', 'cid', 'video_title', 'title_hashtags']
+
+
+def _complexity_counts_pandas(s: pd.Series) -> tuple:
+    """Count words, unique words, syllables and sentences with pandas string kernels."""
+    # Arrow strings: lowercased by the same kernel as the Numba path on any pandas version
+    lowered = s.fillna("").astype(str).astype("string[pyarrow]").str.lower()
+    tokens = lowered.str.findall(_WORD_RE)
+
+    word_count = tokens.str.len().to_numpy()
+    unique_count = tokens.map(lambda words: len(set(words))).to_numpy()
+    # Every word has at least one syllable, vowel groups or not ("hmm", "10")
+    syllables = tokens.map(
+        lambda words: sum(max(1, len(_SYLLABLE_RE.findall(word))) for word in words)
+    ).to_numpy()
+    sentences = lowered.str.count(_SENTENCE_RE).to_numpy()
+    return word_count, unique_count, syllables, sentences
+
+
+def _heuristic_labels(s: pd.Series) -> np.ndarray:
+    """
+    Label comments that carry no signal for the model (emoji, links, mentions).
+
+    Args:
+        s: Normalized (lowercased) comment texts
+
+    Returns:
+        Object array with POSITIVE/NEGATIVE/NEUTRAL for no-signal comments
+        and None for comments that should go through the model
+    """
+    s = s.fillna("").astype(str)
+    no_signal = ~s.str.replace(_LINK_MENTION_RE, " ", regex=True).str.contains(_SIGNAL_RE)
+    positive = s.str.contains(_POSITIVE_EMOJI_RE)
+    negative = s.str.contains(_NEGATIVE_EMOJI_RE)
+
+    labels = np.full(len(s), None, dtype=object)
+    labels[no_signal.to_numpy()] = 'NEUTRAL'
+    labels[(no_signal & positive & ~negative).to_numpy()] = 'POSITIVE'
+    labels[(no_signal & negative & ~positive).to_numpy()] = 'NEGATIVE'
+    return labels
+
+
+if njit is not None:
+    # Code point -> is a word character; built from the regex itself so both
+    # paths tokenize alike in every script
+    _WORD_TABLE = np.zeros(0x110000, dtype=np.bool_)
+    _WORD_TABLE[[m.start() for m in _WORD_CHAR_RE.finditer(''.join(map(chr, range(0x110000))))]] = True
+
+    @njit(parallel=True, cache=True, boundscheck=False)
+    def _complexity_kernel(data, offsets, word_table, out_words, out_unique, out_syllables, out_sentences):
+        """
+        Scan lowercased UTF-8 comments stored in Arrow layout (flat bytes + offsets).
+
+        Per row, counts [\\w'’]+ words, distinct words (via 64-bit FNV-1a
+        hashes), syllables as max(1, [aeiouy]+ vowel groups) per word and
+        [.!?]+ sentence enders.
+        """
+        for r in prange(len(offsets) - 1):
+            start, end = offsets[r], offsets[r + 1]
+            hashes = np.empty(end - start, dtype=np.int64)
+            n_words = 0
+            syllables = 0
+            word_syllables = 0
+            sentences = 0
+            h = np.int64(1469598103934665603)
+            in_word = False
+            in_vowel = False
+            in_sentence_end = False
+
+            i = start
+            while i < end:
+                # Decode one UTF-8 code point
+                b = np.int64(data[i])
+                if b < 0x80:
+                    cp = b
+                    i += 1
+                elif b < 0xE0:
+                    cp = ((b & 0x1F) << 6) | (data[i + 1] & 0x3F)
+                    i += 2
+                elif b < 0xF0:
+                    cp = ((b & 0x0F) << 12) | ((data[i + 1] & 0x3F) << 6) | (data[i + 2] & 0x3F)
+                    i += 3
+                else:
+                    cp = (((b & 0x07) << 18) | ((data[i + 1] & 0x3F) << 12)
+                          | ((data[i + 2] & 0x3F) << 6) | (data[i + 3] & 0x3F))
+                    i += 4
+
+                if word_table[cp]:
+                    if not in_word:
+                        h = np.int64(1469598103934665603)
+                        word_syllables = 0
+                        in_vowel = False
+                        in_word = True
+                    h = (h ^ cp) * np.int64(1099511628211)
+
+                    is_vowel = cp == 97 or cp == 101 or cp == 105 or cp == 111 or cp == 117 or cp == 121
+                    if is_vowel and not in_vowel:
+                        word_syllables += 1
+                    in_vowel = is_vowel
+                elif in_word:
+                    hashes[n_words] = h
+                    n_words += 1
+                    syllables += max(1, word_syllables)
+                    in_word = False
+
+                is_sentence_end = cp == 46 or cp == 33 or cp == 63
+                if is_sentence_end and not in_sentence_end:
+                    sentences += 1
+                in_sentence_end = is_sentence_end
+
+            if in_word:
+                hashes[n_words] = h
+                n_words += 1
+                syllables += max(1, word_syllables)
+
+            unique = 0
+            if n_words:
+                ordered = np.sort(hashes[:n_words])
+                unique = 1
+                for k in range(1, n_words):
+                    if ordered[k] != ordered[k - 1]:
+                        unique += 1
+
+            out_words[r] = n_words
+            out_unique[r] = unique
+            out_syllables[r] = syllables
+            out_sentences[r] = sentences
+else:
+    _complexity_kernel = None
+
+
+def _complexity_counts_numba(s: pd.Series) -> tuple:
+    """Count words, unique words, syllables and sentences with the Numba kernel."""
+    arr = pa.array(s.fillna("").astype(str), type=pa.large_string())
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+    # Full Unicode lowercasing, the same kernel pandas' str.lower uses
+    arr = pc.utf8_lower(arr)
+
+    _, offsets_buf, data_buf = arr.buffers()
+    offsets = np.frombuffer(offsets_buf, dtype=np.int64)[arr.offset:arr.offset + len(arr) + 1]
+    data = np.frombuffer(data_buf, dtype=np.uint8) if data_buf is not None else np.empty(0, dtype=np.uint8)
+
+    counts = [np.zeros(len(arr), dtype=np.int64) for _ in range(4)]
+    _complexity_kernel(data, offsets, _WORD_TABLE, *counts)
+    return tuple(counts)
+
+
+def _complexity_frame(s: pd.Series) -> pd.DataFrame:
+    """
+    Calculate linguistic complexity metrics for a whole Series at once.
+
+    Each comment is tokenized a single time, by the Numba kernel when numba
+    is installed or by pandas string kernels otherwise, and the Flesch
+    Reading Ease formula is applied column-wise.
+    Module-level so it can be shipped to worker processes.
+
+    Args:
+        s: Series of comment texts
+
+    Returns:
+        DataFrame with lexical_density, flesch_reading_ease and word_count
+    """
+    if _complexity_kernel is not None:
+        word_count, unique_count, syllables, sentences = _complexity_counts_numba(s)
+    else:
+        word_count, unique_count, syllables, sentences = _complexity_counts_pandas(s)
+
+    # Empty comments get 0.0 for every metric
+    words = np.where(word_count > 0, word_count, 1).astype(float)
+    sentences = np.maximum(sentences, 1)
+    lexical_density = np.where(word_count > 0, unique_count / words, 0.0)
+    flesch = np.where(word_count > 0,
+                      206.835 - 1.015 * (words / sentences) - 84.6 * (syllables / words),
+                      0.0)
+
+    return pd.DataFrame({
+        'lexical_density': np.round(lexical_density, 4),
+        'flesch_reading_ease': np.round(flesch, 2),
+        'word_count': word_count.astype(int)
+    }, index=s.index)
+
 
 class CommentAnalyzer:
     """Analyzes comments for sentiment and linguistic complexity."""
 
-    def __init__(self, input_path: str = "data/merged_data.csv",
-                 output_path: str = "data/merged_data.csv",
+    MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+    # Pinned so cached sentiment results stay valid across runs
+    MODEL_REVISION = "714eb0f"
+    # Categories of sentiment_label (NEUTRAL: no-signal heuristic, UNKNOWN: failed batch)
+    SENTIMENT_LABELS = ['POSITIVE', 'NEGATIVE', 'NEUTRAL', 'UNKNOWN']
+    # Rows per chunk when streaming the input columns to the output
+    CHUNK_ROWS = 100_000
+
+    def __init__(self, input_path: str = "data/cleaned_data.parquet",
+                 output_path: str = "data/merged_data.parquet",
                  log_dir: str = "logs",
-                 batch_size: int = 32):
+                 batch_size: int = 32,
+                 model_dir: str = "data/models",
+                 cache_dir: str = "data/cache",
+                 compile_model: bool = None):
         """
         Initialize the analyzer.
 
         Args:
-            input_path: Path to input CSV file
-            output_path: Path for output CSV file (can be same as input)
+            input_path: Path to cleaned Parquet or CSV file
+            output_path: Path for output file; Parquet unless it ends in .csv
             log_dir: Directory for log files
             batch_size: Batch size for sentiment analysis
+            model_dir: Directory caching the quantized ONNX model
+            cache_dir: Directory for the SQLite sentiment result cache
+            compile_model: Whether to torch.compile the PyTorch model (default: only
+                on CUDA; on CPU the warmup and recompiles cost more than they save)
         """
         self.input_path = Path(input_path)
         self.output_path = Path(output_path)
         self.log_dir = Path(log_dir)
+        self.model_dir = Path(model_dir)
+        self.cache_dir = Path(cache_dir)
         self.batch_size = batch_size
+        self.compile_model = torch.cuda.is_available() if compile_model is None else compile_model
 
         # Model components (loaded lazily)
-        self.sentiment_pipeline = None
-        self.device = None
+        self.tokenizer = None
+        self.model = None
+        self.torch_device = None
+        self.model_dtype = torch.float32
+        # Backend/precision tag set by load_model; part of the cache key
+        self.backend = None
 
         # Create directories
         self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
 
         # Setup logging
-        self._setup_logging()
-
-    def _setup_logging(self):
-        """Configure logging to file and console."""
-        log_file = self.log_dir / f"analyzer_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
+        self.logger = setup_stage_logger(__name__, self.log_dir, "analyzer")
 
     def load_model(self):
         """Load the DistilBERT sentiment analysis model."""
         self.logger.info("Loading DistilBERT sentiment model...")
 
         # Check for GPU availability
-        self.device = 0 if torch.cuda.is_available() else -1
-        device_name = "GPU" if self.device == 0 else "CPU"
+        self.torch_device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        device_name = "GPU" if self.torch_device.type == "cuda" else "CPU"
         self.logger.info(f"Using device: {device_name}")
 
-        # Load the sentiment analysis pipeline
-        model_name = "distilbert-base-uncased-finetuned-sst-2-english"
-        self.sentiment_pipeline = pipeline(
-            "sentiment-analysis",
-            model=model_name,
-            tokenizer=model_name,
-            device=self.device,
-            truncation=True,
-            max_length=512
-        )
+        # Rust-backed fast tokenizer; texts are tokenized once per run, outside the model loop
+        model_name = self.MODEL_NAME
+        revision = self.MODEL_REVISION
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, revision=revision, use_fast=True)
+
+        # Load the classifier (int8 ONNX model on CPU when available)
+        model = None
+        if self.torch_device.type == "cpu":
+            model = self._load_quantized_model(model_name)
+        if model is None:
+            model = AutoModelForSequenceClassification.from_pretrained(model_name, revision=revision)
+            if self.torch_device.type == "cuda":
+                # Half-precision weights; BF16 keeps FP32's range where the GPU supports it
+                self.model_dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+                self.logger.info(f"Using {str(self.model_dtype).replace('torch.', '')} weights")
+            model = model.eval().to(device=self.torch_device, dtype=self.model_dtype)
+            self.backend = f"torch-{str(self.model_dtype).replace('torch.', '')}"
+            model = self._optimize_torch_model(model)
+        self.model = model
+
+        self.logger.info(f"Model loaded successfully ({self.backend})")
+
+    def _load_quantized_model(self, model_name: str):
+        """
+        Load an int8 dynamically quantized ONNX Runtime build of the model.
+
+        The ONNX export and quantization run once; the result is cached in
+        model_dir and reused on later runs.
+
+        Args:
+            model_name: Hugging Face model name
+
+        Returns:
+            ORTModelForSequenceClassification, or None if optimum is unavailable
+        """
+        try:
+            from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+            from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        except ImportError:
+            self.logger.info("optimum[onnxruntime] not installed, using PyTorch model")
+            return None
+
+        # Revision in the name: a new pinned revision gets a fresh export
+        cache_dir = self.model_dir / f"{model_name}-{self.MODEL_REVISION}-onnx-int8"
+        quantized_file = "model_quantized.onnx"
+
+        try:
+            if not (cache_dir / quantized_file).exists():
+                self.logger.info(f"Building int8 ONNX model in {cache_dir} (one-time)...")
+                onnx_model = ORTModelForSequenceClassification.from_pretrained(
+                    model_name,
+                    revision=self.MODEL_REVISION,
+                    export=True
+                )
+                qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+                ORTQuantizer.from_pretrained(onnx_model).quantize(
+                    save_dir=cache_dir,
+                    quantization_config=qconfig
+                )
+
+            model = ORTModelForSequenceClassification.from_pretrained(cache_dir, file_name=quantized_file)
+            self.backend = "onnx-int8"
+            self.logger.info("Using int8 ONNX Runtime model")
+            return model
+        except Exception as e:
+            self.logger.warning(f"Could not load quantized ONNX model, using PyTorch model: {e}")
+            return None
+
+    def _optimize_torch_model(self, model):
+        """
+        Apply fused attention kernels (GPU) or int8 dynamic quantization (CPU),
+        then torch.compile, to the PyTorch model.
+
+        Each step is optional: if it is unavailable or fails, the model from
+        the previous step (ultimately plain eager PyTorch) is kept.
+
+        Args:
+            model: Eval-mode PyTorch sequence classification model
+
+        Returns:
+            Optimized model
+        """
+        if self.torch_device.type == "cuda":
+            torch.backends.cuda.matmul.allow_tf32 = True
+
+            try:
+                from optimum.bettertransformer import BetterTransformer
+                model = BetterTransformer.transform(model, keep_original_model=False)
+                self.logger.info("Using BetterTransformer fused attention")
+            except Exception as e:
+                self.logger.info(f"BetterTransformer not applied: {e}")
+        else:
+            # Fallback when the int8 ONNX model is unavailable: int8 Linear layers in PyTorch
+            try:
+                model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                self.backend = "torch-qint8"
+                self.logger.info("Using int8 dynamically quantized PyTorch model")
+            except Exception as e:
+                self.logger.warning(f"Dynamic quantization failed, using FP32 model: {e}")
+
+        if not self.compile_model:
+            return model
+
+        try:
+            compiled = torch.compile(model, mode="reduce-overhead", dynamic=True)
+
+            # Compilation is lazy, so run one batch to surface failures here
+            warmup = self.tokenizer(["warm up"], return_tensors='pt').to(self.torch_device)
+            with torch.inference_mode(), self._autocast():
+                compiled(**warmup)
 
-        self.logger.info("Model loaded successfully")
+            self.logger.info("Using torch.compile model")
+            return compiled
+        except Exception as e:
+            self.logger.warning(f"torch.compile failed, using eager model: {e}")
+            return model
+
+    def _autocast(self):
+        """Return a half-precision (BF16/FP16) autocast context on GPU (no-op on CPU)."""
+        dtype = self.model_dtype if self.model_dtype != torch.float32 else torch.float16
+        return torch.autocast('cuda', dtype=dtype, enabled=self.torch_device.type == "cuda")
 
     def analyze_sentiment(self, text: str) -> dict:
         """
@@ -94,60 +429,163 @@ class CommentAnalyzer:
         Returns:
             Dict with 'label' (POSITIVE/NEGATIVE) and 'score' (confidence)
         """
-        if not self.sentiment_pipeline:
-            self.load_model()
+        text = text if isinstance(text, str) else ""
+        labels, scores = self._predict_sentiment([text])
+        return {'label': labels[0], 'score': float(scores[0])}
 
-        try:
-            result = self.sentiment_pipeline(text[:512])[0]  # Truncate to max length
-            return {
-                'label': result['label'],
-                'score': result['score']
-            }
-        except Exception as e:
-            self.logger.warning(f"Error analyzing sentiment: {e}")
-            return {'label': 'UNKNOWN', 'score': 0.0}
+    def _open_cache(self) -> sqlite3.Connection:
+        """Open the SQLite sentiment cache, creating the table on first use."""
+        conn = sqlite3.connect(self.cache_dir / "sentiment_v1.sqlite")
+        conn.execute("CREATE TABLE IF NOT EXISTS sent(h BLOB PRIMARY KEY, label TEXT, score REAL)")
+        return conn
+
+    def _cache_key(self, text: str) -> bytes:
+        """
+        Fingerprint a normalized text together with the model it was scored by.
+
+        The backend tag (ONNX int8, quantized or FP32 PyTorch, FP16/BF16 on GPU)
+        is included since each produces slightly different scores; the model
+        must be loaded first.
+        """
+        key = f"{self.MODEL_NAME}\0{self.MODEL_REVISION}\0{self.backend}\0{text}"
+        return hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+
+    def _load_cache(self, conn: sqlite3.Connection, keys: list) -> dict:
+        """
+        Look up cached results for the given fingerprints.
+
+        Args:
+            conn: Open cache connection
+            keys: Fingerprints from _cache_key
 
-    def analyze_sentiment_batch(self, texts: list) -> list:
+        Returns:
+            Dict mapping fingerprint to (label, score) for every hit
+        """
+        found = {}
+        # Stay below SQLite's default limit on bound parameters per statement
+        for i in range(0, len(keys), 900):
+            chunk = keys[i:i + 900]
+            placeholders = ",".join("?" * len(chunk))
+            query = f"SELECT h, label, score FROM sent WHERE h IN ({placeholders})"
+            for key, label, score in conn.execute(query, chunk):
+                found[key] = (label, score)
+        return found
+
+    def analyze_sentiment_batch(self, texts: list) -> tuple:
         """
         Analyze sentiment for multiple texts in batches.
 
+        Identical comments (after normalization) are scored once, and scores
+        from previous runs are reused from the SQLite cache. Comments with no
+        word of three or more letters (emoji, links, mentions) skip the model:
+        they are NEUTRAL, or POSITIVE/NEGATIVE for a few unambiguous emoji.
+
         Args:
             texts: List of text strings
 
         Returns:
-            List of dicts with 'label' and 'score'
+            Tuple of (labels, scores) arrays aligned with texts: object array of
+            labels and float32 array of confidence scores
         """
-        if not self.sentiment_pipeline:
+        self.logger.info(f"Analyzing sentiment for {len(texts)} comments...")
+
+        # Normalize and deduplicate so repeated comments hit the model once;
+        # length is capped at 512 tokens by the tokenizer, not by slicing characters
+        norm = [text.strip().lower() if isinstance(text, str) else "" for text in texts]
+        inverse, unique = pd.factorize(pd.Series(norm, dtype=object))
+        self.logger.info(f"{len(unique)} unique comments after deduplication")
+
+        # No-signal comments are labelled directly and never reach cache or model
+        labels = _heuristic_labels(pd.Series(unique, dtype=object))
+        scores = np.full(len(unique), _HEURISTIC_SCORE, dtype=np.float32)
+        candidates = np.flatnonzero(pd.isna(labels))
+        self.logger.info(f"{len(unique) - len(candidates)} no-signal comments labelled without the model")
+
+        # The cache key depends on which backend the model loaded with
+        if len(candidates) and self.model is None:
             self.load_model()
+        keys = {i: self._cache_key(unique[i]) for i in candidates}
+
+        with closing(self._open_cache()) as conn:
+            cached = self._load_cache(conn, [keys[i] for i in candidates])
+            misses = []
+            for i in candidates:
+                key = keys[i]
+                if key in cached:
+                    labels[i], scores[i] = cached[key]
+                else:
+                    misses.append(i)
+            self.logger.info(f"Reused {len(cached)} cached sentiment results")
+
+            # Only cache misses go through the model
+            labels[misses], scores[misses] = self._predict_sentiment([unique[i] for i in misses])
+
+            # Failed batches are not cached so they are retried next run
+            rows = [(keys[i], labels[i], float(scores[i])) for i in misses if labels[i] != 'UNKNOWN']
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO sent VALUES (?, ?, ?)", rows)
+
+        return labels[inverse], scores[inverse]
+
+    def _predict_sentiment(self, texts: list) -> tuple:
+        """
+        Run the sentiment model over texts in length-sorted batches.
 
-        results = []
-        self.logger.info(f"Analyzing sentiment for {len(texts)} comments...")
+        Args:
+            texts: List of text strings
 
-        # Process in batches with progress bar
-        for i in tqdm(range(0, len(texts), self.batch_size), desc="Sentiment Analysis"):
-            batch = texts[i:i + self.batch_size]
+        Returns:
+            Tuple of (labels, scores) arrays in input order
+        """
+        labels = np.full(len(texts), 'UNKNOWN', dtype=object)
+        scores = np.zeros(len(texts), dtype=np.float32)
+        if not texts:
+            return labels, scores
+
+        if self.model is None:
+            self.load_model()
+
+        # Tokenize everything once with the fast tokenizer (truncated, unpadded)
+        encodings = self.tokenizer(texts, padding=False, truncation=True, max_length=512)
+        input_names = list(encodings.keys())
+        id2label = np.array([self.model.config.id2label[i] for i in range(len(self.model.config.id2label))],
+                            dtype=object)
 
-            # Truncate texts to max length
-            batch = [text[:512] if isinstance(text, str) else "" for text in batch]
+        # Sort by token length so every batch holds similarly sized comments and
+        # is padded only to a nearby length; results are scattered back by index
+        order = np.argsort([len(ids) for ids in encodings['input_ids']], kind='stable')
+
+        # Process in batches with progress bar
+        for i in tqdm(range(0, len(order), self.batch_size), desc="Sentiment Analysis"):
+            idx = order[i:i + self.batch_size]
 
             try:
-                batch_results = self.sentiment_pipeline(batch)
-                for result in batch_results:
-                    results.append({
-                        'label': result['label'],
-                        'score': result['score']
-                    })
+                features = [{name: encodings[name][j] for name in input_names} for j in idx]
+                batch = self.tokenizer.pad(
+                    features,
+                    padding='longest',
+                    pad_to_multiple_of=8,
+                    return_tensors='pt'
+                ).to(self.torch_device)
+
+                with torch.inference_mode(), self._autocast():
+                    logits = self.model(**batch).logits
+
+                batch_scores, label_ids = logits.float().softmax(-1).max(-1)
+                labels[idx] = id2label[label_ids.cpu().numpy()]
+                scores[idx] = batch_scores.cpu().numpy()
             except Exception as e:
-                self.logger.warning(f"Error in batch {i}: {e}")
-                # Fill with unknown for failed batch
-                for _ in batch:
-                    results.append({'label': 'UNKNOWN', 'score': 0.0})
+                # Failed batch keeps the UNKNOWN / 0.0 defaults
+                self.logger.warning("Error in batch %d: %s", i, e)
 
-        return results
+        return labels, scores
 
     def calculate_complexity(self, text: str) -> dict:
         """
-        Calculate linguistic complexity metrics using textstat.
+        Calculate linguistic complexity metrics for a single text.
+
+        Runs the batched _complexity_frame used by run(), so single texts and
+        whole datasets are always scored the same way.
 
         Args:
             text: Input text
@@ -155,74 +593,191 @@ class CommentAnalyzer:
         Returns:
             Dict with complexity metrics
         """
-        if not isinstance(text, str) or len(text.strip()) == 0:
-            return {
-                'lexical_density': 0.0,
-                'flesch_reading_ease': 0.0,
-                'word_count': 0
-            }
+        row = _complexity_frame(pd.Series([text if isinstance(text, str) else ""], dtype=object)).iloc[0]
+        return {
+            'lexical_density': float(row['lexical_density']),
+            'flesch_reading_ease': float(row['flesch_reading_ease']),
+            'word_count': int(row['word_count'])
+        }
+
+    def load_text(self) -> pd.Series:
+        """
+        Load only the comment text column of the input dataset (memory-mapped).
+
+        Returns:
+            Series of comment texts in input row order
+        """
+        if self.input_path.suffix == '.parquet':
+            table = pq.read_table(self.input_path, columns=['text'], memory_map=True)
+            return table.column('text').to_pandas()
 
         try:
-            # Lexical density: ratio of content words to total words
-            # Using textstat's lexicon count as a proxy
-            word_count = textstat.lexicon_count(text, removepunct=True)
-
-            # Flesch Reading Ease (higher = easier to read)
-            flesch = textstat.flesch_reading_ease(text)
-
-            # Calculate lexical density as unique words / total words
-            words = text.lower().split()
-            unique_words = set(words)
-            lexical_density = len(unique_words) / len(words) if words else 0.0
-
-            return {
-                'lexical_density': round(lexical_density, 4),
-                'flesch_reading_ease': round(flesch, 2),
-                'word_count': word_count
-            }
-        except Exception as e:
-            self.logger.warning(f"Error calculating complexity: {e}")
-            return {
-                'lexical_density': 0.0,
-                'flesch_reading_ease': 0.0,
-                'word_count': 0
-            }
+            with pa.memory_map(str(self.input_path)) as source:
+                table = pa_csv.read_csv(
+                    source,
+                    read_options=pa_csv.ReadOptions(use_threads=True, block_size=8 << 20),
+                    convert_options=pa_csv.ConvertOptions(
+                        include_columns=['text'],
+                        column_types={'text': pa.string()}
+                    )
+                )
+            return table.column('text').to_pandas(types_mapper=pd.ArrowDtype)
+        except pa.ArrowInvalid as e:
+            self.logger.warning(f"Arrow CSV reader failed, falling back to pandas: {e}")
+            return pd.read_csv(self.input_path, usecols=['text'], dtype={'text': str})['text']
+
+    def _iter_input_chunks(self, arrow_csv: bool = True):
+        """
+        Stream the full input dataset in chunks of CHUNK_ROWS rows.
+
+        Args:
+            arrow_csv: Use the streaming Arrow CSV reader (else pandas, all columns as strings)
+
+        Yields:
+            pyarrow Tables with every input column; a single empty table with
+            the input schema if the input has no rows
+        """
+        if self.input_path.suffix == '.parquet':
+            parquet_file = pq.ParquetFile(self.input_path, memory_map=True)
+            schema = parquet_file.schema_arrow
+            batches = parquet_file.iter_batches(batch_size=self.CHUNK_ROWS)
+        elif arrow_csv:
+            reader = pa_csv.open_csv(
+                self.input_path,
+                read_options=pa_csv.ReadOptions(block_size=8 << 20),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={col: pa.string() for col in _STRING_COLUMNS}
+                )
+            )
+            schema = reader.schema
+            batches = reader
+        else:
+            columns = pd.read_csv(self.input_path, nrows=0).columns
+            schema = pa.schema([(col, pa.string()) for col in columns])
+
+            def read_chunks():
+                with pd.read_csv(self.input_path, chunksize=self.CHUNK_ROWS, dtype=str) as reader:
+                    for chunk in reader:
+                        yield pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+            batches = read_chunks()
+
+        empty = True
+        for batch in batches:
+            empty = False
+            yield pa.Table.from_batches([batch])
+        if empty:
+            yield schema.empty_table()
+
+    def _stream_output(self, results: pa.Table, path: Path, arrow_csv: bool = True):
+        """
+        Copy the input dataset chunk by chunk into path with the result columns attached.
+
+        Args:
+            results: Analysis columns, one row per input row
+            path: File to write (Parquet, or CSV if output_path ends in .csv)
+            arrow_csv: Passed to _iter_input_chunks
+        """
+        to_csv = self.output_path.suffix == '.csv'
+        writer = None
+        offset = 0
+        try:
+            for chunk in self._iter_input_chunks(arrow_csv):
+                # Re-analyzing an analyzed dataset replaces the old result columns
+                chunk = chunk.drop_columns([c for c in results.column_names if c in chunk.column_names])
+                for name in results.column_names:
+                    chunk = chunk.append_column(name, results.column(name).slice(offset, chunk.num_rows))
+                chunk = chunk.replace_schema_metadata(None)
+                if to_csv:
+                    # Older pyarrow CSV writers reject dictionary columns (sentiment_label,
+                    # and video_id/author from the processor's Parquet output)
+                    chunk = chunk.cast(pa.schema([
+                        field.with_type(field.type.value_type) if pa.types.is_dictionary(field.type) else field
+                        for field in chunk.schema
+                    ]))
+                offset += chunk.num_rows
+
+                if writer is None:
+                    if to_csv:
+                        writer = pa_csv.CSVWriter(path, chunk.schema)
+                    else:
+                        writer = pq.ParquetWriter(path, chunk.schema, compression='zstd')
+                writer.write_table(chunk)
+
+            if offset != results.num_rows:
+                raise ValueError(f"Input has {offset} rows but {results.num_rows} were analyzed")
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def save_data(self, results: pd.DataFrame):
+        """
+        Save the analyzed dataset (Parquet by default, CSV if requested).
+
+        The input columns are streamed from input_path in chunks rather than
+        held in memory, and the output is written to a temporary file that is
+        atomically renamed into place.
+
+        Args:
+            results: Analysis columns, one row per input row
+        """
+        table = pa.Table.from_pandas(results, preserve_index=False)
+
+        tmp_path = self.output_path.with_name(f"{self.output_path.name}.tmp")
+        try:
+            try:
+                self._stream_output(table, tmp_path)
+            except pa.ArrowInvalid as e:
+                # Streaming CSV types come from the first block; re-read later mismatches as strings
+                self.logger.warning(f"Arrow CSV reader failed, falling back to pandas: {e}")
+                self._stream_output(table, tmp_path, arrow_csv=False)
+            os.replace(tmp_path, self.output_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
 
     def run(self) -> pd.DataFrame:
         """
         Main execution logic.
 
+        Only the text column is loaded; the remaining input columns are
+        streamed through to the output by save_data.
+
         Returns:
-            DataFrame with analysis columns added
+            DataFrame with the text and analysis columns, one row per input
+            comment (the other input columns are only in output_path)
         """
         self.logger.info("=" * 50)
         self.logger.info("Starting Comment Analysis")
         self.logger.info("=" * 50)
 
         # Load data
-        self.logger.info(f"Loading data from: {self.input_path}")
-        df = pd.read_csv(self.input_path)
-        self.logger.info(f"Loaded {len(df)} comments")
+        self.logger.info(f"Loading comment text from: {self.input_path}")
+        text = self.load_text()
+        self.logger.info(f"Loaded {len(text)} comments")
+
+        # Linguistic complexity runs in worker processes while the model
+        # scores sentiment, so the two stages overlap instead of running back to back
+        # (the Numba kernel already parallelizes across rows, so one worker is enough)
+        n_workers = 1 if _complexity_kernel is not None else max(1, min(os.cpu_count() or 1, len(text)))
+        bounds = np.linspace(0, len(text), n_workers + 1, dtype=int)
+        shards = [text.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
 
-        # Sentiment Analysis (batch processing)
-        texts = df['text'].tolist()
-        sentiment_results = self.analyze_sentiment_batch(texts)
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            self.logger.info(f"Calculating linguistic complexity in {n_workers} worker processes...")
+            complexity_shards = pool.map(_complexity_frame, shards)
 
-        df['sentiment_label'] = [r['label'] for r in sentiment_results]
-        df['sentiment_score'] = [r['score'] for r in sentiment_results]
+            # Sentiment Analysis (batch processing)
+            labels, scores = self.analyze_sentiment_batch(text.tolist())
 
-        # Linguistic Complexity Analysis
-        self.logger.info("Calculating linguistic complexity...")
-        complexity_results = []
-        for text in tqdm(texts, desc="Complexity Analysis"):
-            complexity_results.append(self.calculate_complexity(text))
+            complexity = pd.concat(list(complexity_shards))
 
-        df['lexical_density'] = [r['lexical_density'] for r in complexity_results]
-        df['flesch_reading_ease'] = [r['flesch_reading_ease'] for r in complexity_results]
-        df['word_count'] = [r['word_count'] for r in complexity_results]
+        df = pd.DataFrame({
+            'sentiment_label': pd.Categorical(labels, categories=self.SENTIMENT_LABELS),
+            'sentiment_score': scores
+        })
+        df = pd.concat([df, complexity.reset_index(drop=True)], axis=1)
 
         # Save results
-        df.to_csv(self.output_path, index=False, encoding='utf-8')
+        self.save_data(df)
         self.logger.info(f"Saved analyzed data to {self.output_path}")
 
         # Summary statistics
@@ -231,7 +786,7 @@ class CommentAnalyzer:
         self.logger.info(f"Total comments analyzed: {len(df)}")
 
         sentiment_counts = df['sentiment_label'].value_counts()
-        for label, count in sentiment_counts.items():
+        for label, count in sentiment_counts[sentiment_counts > 0].items():
             pct = count / len(df) * 100
             self.logger.info(f"  {label}: {count} ({pct:.1f}%)")
 
@@ -239,6 +794,7 @@ class CommentAnalyzer:
         self.logger.info(f"Average word count: {df['word_count'].mean():.1f}")
         self.logger.info("=" * 50)
 
+        df.insert(0, 'text', text.reset_index(drop=True))
         return df
 
 
@@ -247,16 +803,20 @@ def main():
     import argparse
 
     parser = argparse.ArgumentParser(description="Analyze comments for sentiment and complexity")
-    parser.add_argument("--input", default="data/merged_data.csv", help="Input CSV path")
-    parser.add_argument("--output", default="data/merged_data.csv", help="Output CSV path")
+    parser.add_argument("--input", default="data/cleaned_data.parquet", help="Input Parquet or CSV path")
+    parser.add_argument("--output", default="data/merged_data.parquet",
+                        help="Output path (Parquet, or CSV if it ends in .csv)")
     parser.add_argument("--batch-size", type=int, default=32, help="Batch size for sentiment analysis")
+    parser.add_argument("--compile", dest="compile_model", action=argparse.BooleanOptionalAction,
+                        default=None, help="torch.compile the model (default: only when CUDA is available)")
 
     args = parser.parse_args()
 
     analyzer = CommentAnalyzer(
         input_path=args.input,
         output_path=args.output,
-        batch_size=args.batch_size
+        batch_size=args.batch_size,
+        compile_model=args.compile_model
     )
     analyzer.run()
 
@@ -1,62 +1,98 @@
 """
 Data Collection Module - YouTube Comment Collector
 
-Collects comments from all videos of a YouTube channel using yt-dlp and youtube-comment-downloader.
-Supports checkpoint/resume functionality for robust data collection.
+Collects comments from all videos of a YouTube channel using the yt-dlp and
+youtube-comment-downloader Python APIs (in-process, no subprocess per video).
+Comments are written to a Parquet dataset partitioned by video_id (or to
+per-video JSON Lines files with --json). Supports checkpoint/resume
+functionality for robust data collection.
 """
 
 import os
-import subprocess
+import json
+import asyncio
+import sqlite3
+import threading
 import time
-import logging
 from pathlib import Path
-from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import yt_dlp
+from aiolimiter import AsyncLimiter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from youtube_comment_downloader import YoutubeCommentDownloader, SORT_BY_RECENT
+
+from logging_setup import setup_stage_logger
 
 
 class YouTubeCommentCollector:
     """Collects YouTube comments from a channel with checkpoint support."""
 
-    def __init__(self, channel_url: str, output_dir: str = "data/raw_json",
-                 progress_dir: str = "data/progress", log_dir: str = "logs"):
+    # Fields kept from youtube-comment-downloader records in the Parquet dataset
+    COMMENT_SCHEMA = pa.schema([
+        ('cid', pa.string()),
+        ('text', pa.string()),
+        ('time', pa.string()),
+        ('author', pa.string()),
+        ('channel', pa.string()),
+        ('votes', pa.string()),
+        ('replies', pa.string()),
+        ('heart', pa.bool_()),
+        ('reply', pa.bool_()),
+        ('time_parsed', pa.float64())
+    ])
+
+    def __init__(self, channel_url: str, output_dir: str = "data/raw_parquet",
+                 progress_dir: str = "data/progress", log_dir: str = "logs",
+                 max_concurrency: int = 8, requests_per_minute: int = 20,
+                 output_format: str = "parquet", max_failed_runs: int = 3):
         """
         Initialize the collector.
 
         Args:
             channel_url: YouTube channel URL (e.g., https://www.youtube.com/@ChannelName)
-            output_dir: Directory to save comment JSON files
-            progress_dir: Directory to save progress files for checkpoint/resume
+            output_dir: Root of the comment Parquet dataset (or JSON directory)
+            progress_dir: Directory for the checkpoint/resume progress database
             log_dir: Directory for log files
+            max_concurrency: Maximum number of videos downloaded at the same time
+            requests_per_minute: Global cap on download attempts started per minute
+            output_format: "parquet" (partitioned dataset) or "json" (one file per video, for debugging)
+            max_failed_runs: Runs a video may fail before it is no longer retried
         """
         self.channel_url = channel_url
         self.output_dir = Path(output_dir)
         self.progress_dir = Path(progress_dir)
         self.log_dir = Path(log_dir)
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.output_format = output_format
+        self.max_failed_runs = max_failed_runs
+
+        # One downloader (and so one pooled HTTP session) per worker thread
+        self._local = threading.local()
 
         # Create directories
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.progress_dir.mkdir(parents=True, exist_ok=True)
         self.log_dir.mkdir(parents=True, exist_ok=True)
 
-        # Progress files
+        # Legacy text progress files (migrated into the database once)
         self.completed_file = self.progress_dir / "completed.txt"
         self.failed_file = self.progress_dir / "failed.txt"
 
         # Setup logging
-        self._setup_logging()
-
-    def _setup_logging(self):
-        """Configure logging to file and console."""
-        log_file = self.log_dir / f"collect_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
+        self.logger = setup_stage_logger(__name__, self.log_dir, "collect")
+
+        # Progress database: autocommit + WAL so every save is a cheap atomic write
+        self.db = sqlite3.connect(self.progress_dir / "progress.sqlite", isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS videos("
+            "id TEXT PRIMARY KEY, status INT, ts INT, attempts INT NOT NULL DEFAULT 0)"
         )
-        self.logger = logging.getLogger(__name__)
+        self._migrate_progress_files()
 
     def get_video_ids(self) -> list:
         """
@@ -67,121 +103,265 @@ class YouTubeCommentCollector:
         """
         self.logger.info(f"Fetching video IDs from channel: {self.channel_url}")
 
-        try:
-            # Use yt-dlp to get video IDs
-            # Use channel URL directly (yt-dlp handles it)
-            cmd = [
-                "yt-dlp",
-                "--get-id",
-                "--flat-playlist",
-                self.channel_url
-            ]
-
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minute timeout
-            )
+        # Same as `yt-dlp --flat-playlist`: list entries without resolving each video
+        ydl_opts = {
+            "quiet": True,
+            "extract_flat": "in_playlist",
+            "skip_download": True,
+            "socket_timeout": 60
+        }
 
-            if result.returncode != 0:
-                self.logger.error(f"yt-dlp error: {result.stderr}")
-                return []
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(self.channel_url, download=False)
+                video_ids = list(dict.fromkeys(self._iter_video_ids(ydl, info)))
 
-            video_ids = [vid.strip() for vid in result.stdout.strip().split('\n') if vid.strip()]
             self.logger.info(f"Found {len(video_ids)} videos")
             return video_ids
 
-        except subprocess.TimeoutExpired:
-            self.logger.error("Timeout while fetching video IDs")
-            return []
         except Exception as e:
             self.logger.error(f"Error fetching video IDs: {e}")
             return []
 
+    def _iter_video_ids(self, ydl, info: dict):
+        """
+        Yield video IDs from a flat yt-dlp result, descending into channel tabs.
+
+        Args:
+            ydl: Open YoutubeDL instance
+            info: Result of extract_info
+        """
+        for entry in info.get("entries") or []:
+            if not entry:
+                continue
+            if entry.get("entries") is not None:
+                yield from self._iter_video_ids(ydl, entry)
+            elif entry.get("ie_key") == "YoutubeTab" and entry.get("url"):
+                # Channel tabs (Videos, Shorts, ...) come back as unresolved playlists
+                yield from self._iter_video_ids(ydl, ydl.extract_info(entry["url"], download=False))
+            elif entry.get("id"):
+                yield entry["id"]
+
+    def _migrate_progress_files(self):
+        """Bring the progress database up to date (each step runs once)."""
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+
+        if version < 1:
+            # Import completed.txt / failed.txt; failed first so a later success wins
+            now = int(time.time())
+            for path, status in ((self.failed_file, 0), (self.completed_file, 1)):
+                if path.exists():
+                    with open(path, 'r', encoding='utf-8') as f:
+                        rows = [(line.strip(), status, now) for line in f if line.strip()]
+                    self.db.executemany("INSERT OR REPLACE INTO videos(id, status, ts) VALUES (?, ?, ?)", rows)
+                    self.logger.info(f"Migrated {len(rows)} video IDs from {path.name}")
+
+        if version < 2:
+            # Databases created before failed runs were counted
+            columns = [row[1] for row in self.db.execute("PRAGMA table_info(videos)")]
+            if "attempts" not in columns:
+                self.db.execute("ALTER TABLE videos ADD COLUMN attempts INT NOT NULL DEFAULT 0")
+
+        self.db.execute("PRAGMA user_version = 2")
+
     def load_progress(self) -> set:
         """
-        Load completed video IDs from checkpoint file.
+        Load completed video IDs from the progress database.
 
         Returns:
             Set of completed video IDs
         """
-        completed = set()
-        if self.completed_file.exists():
-            with open(self.completed_file, 'r', encoding='utf-8') as f:
-                completed = set(line.strip() for line in f if line.strip())
+        completed = set(row[0] for row in self.db.execute("SELECT id FROM videos WHERE status = 1"))
+        if completed:
             self.logger.info(f"Loaded {len(completed)} completed video IDs from checkpoint")
         return completed
 
+    def load_given_up(self) -> set:
+        """
+        Load video IDs that failed in max_failed_runs runs and are no longer retried.
+
+        Returns:
+            Set of given-up video IDs
+        """
+        given_up = set(row[0] for row in self.db.execute(
+            "SELECT id FROM videos WHERE status = 0 AND attempts >= ?", (self.max_failed_runs,)
+        ))
+        if given_up:
+            self.logger.info(f"Skipping {len(given_up)} video IDs that failed {self.max_failed_runs} runs")
+        return given_up
+
     def save_progress(self, video_id: str, success: bool = True):
         """
-        Save progress for a video ID.
+        Save progress for a video ID, counting failed runs.
 
         Args:
             video_id: The video ID to save
             success: Whether the download was successful
         """
-        target_file = self.completed_file if success else self.failed_file
-        with open(target_file, 'a', encoding='utf-8') as f:
-            f.write(f"{video_id}\n")
+        self.db.execute(
+            "INSERT INTO videos(id, status, ts, attempts) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET status = excluded.status, ts = excluded.ts, "
+            "attempts = videos.attempts + excluded.attempts",
+            (video_id, 1 if success else 0, int(time.time()), 0 if success else 1)
+        )
+
+    def _get_downloader(self) -> YoutubeCommentDownloader:
+        """
+        Get this worker thread's comment downloader, creating it on first use.
+
+        The downloader's requests session is kept for the thread's lifetime so
+        TLS connections are reused across videos. Rate-limit (429) and transient
+        server errors are retried with exponential backoff, honoring Retry-After.
+
+        Returns:
+            Thread-local YoutubeCommentDownloader
+        """
+        downloader = getattr(self._local, "downloader", None)
+        if downloader is None:
+            downloader = YoutubeCommentDownloader()
+            retry = Retry(
+                total=3,
+                backoff_factor=1,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=None,  # comment pages are fetched with POST
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+            downloader.session.mount("https://", adapter)
+            self._local.downloader = downloader
+        return downloader
+
+    def _output_file(self, video_id: str) -> Path:
+        """
+        Get the output path for a video's comments.
+
+        Args:
+            video_id: YouTube video ID
+
+        Returns:
+            Hive-style partition file in the Parquet dataset, or a JSON Lines file
+        """
+        if self.output_format == "json":
+            return self.output_dir / f"{video_id}.json"
+        return self.output_dir / f"video_id={video_id}" / "comments.parquet"
 
-    def download_comments(self, video_id: str, max_retries: int = 3) -> bool:
+    def _fetch_comments(self, video_id: str, output_file: Path, cancel: threading.Event):
+        """
+        Download all comments of a video into its output file (blocking).
+
+        Comments are written to a temporary file that is renamed on success,
+        so an interrupted download never looks complete.
+
+        Args:
+            video_id: YouTube video ID
+            output_file: Final Parquet partition file or JSON Lines path
+            cancel: Set by the caller on timeout to stop the download
+        """
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        # Dot prefix: dataset readers skip hidden files, so a temp file left behind
+        # by a killed run is never mistaken for a partition file
+        tmp_file = output_file.with_name(f".{output_file.name}.{threading.get_ident()}.part")
+        downloader = self._get_downloader()
+        try:
+            if self.output_format == "json":
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    for comment in downloader.get_comments(video_id, sort_by=SORT_BY_RECENT):
+                        if cancel.is_set():
+                            raise TimeoutError(f"Download of {video_id} cancelled")
+                        f.write(json.dumps(comment, ensure_ascii=False) + "\n")
+            else:
+                comments = []
+                for comment in downloader.get_comments(video_id, sort_by=SORT_BY_RECENT):
+                    if cancel.is_set():
+                        raise TimeoutError(f"Download of {video_id} cancelled")
+                    comments.append(comment)
+                # video_id is carried by the partition directory, not stored per row
+                table = pa.Table.from_pylist(comments, schema=self.COMMENT_SCHEMA)
+                pq.write_table(table, tmp_file, compression='zstd')
+            os.replace(tmp_file, output_file)
+        finally:
+            tmp_file.unlink(missing_ok=True)
+
+    async def _download_comments_async(self, video_id: str, sem: asyncio.Semaphore,
+                                       limiter: AsyncLimiter, max_retries: int = 3) -> bool:
         """
         Download comments for a single video with retry logic.
 
         Args:
             video_id: YouTube video ID
+            sem: Semaphore bounding the number of concurrent downloads
+            limiter: Rate limiter shared by all downloads
             max_retries: Maximum number of retry attempts
 
         Returns:
             True if successful, False otherwise
         """
-        output_file = self.output_dir / f"{video_id}.json"
+        output_file = self._output_file(video_id)
 
         # Skip if already downloaded
         if output_file.exists():
-            self.logger.info(f"Skipping {video_id} - already downloaded")
+            self.logger.info("Skipping %s - already downloaded", video_id)
             return True
 
         retry_delays = [1, 3, 5]  # Increasing delays between retries
 
         for attempt in range(max_retries):
+            cancel = threading.Event()
             try:
-                self.logger.info(f"Downloading comments for {video_id} (attempt {attempt + 1}/{max_retries})")
-
-                cmd = [
-                    "youtube-comment-downloader",
-                    "--youtubeid", video_id,
-                    "--output", str(output_file)
-                ]
-
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=180  # 3 minute timeout per video
-                )
-
-                if result.returncode == 0 and output_file.exists():
-                    self.logger.info(f"Successfully downloaded comments for {video_id}")
-                    return True
-                else:
-                    self.logger.warning(f"Failed to download {video_id}: {result.stderr}")
-
-            except subprocess.TimeoutExpired:
-                self.logger.warning(f"Timeout downloading comments for {video_id}")
+                async with sem, limiter:
+                    self.logger.info("Downloading comments for %s (attempt %d/%d)", video_id, attempt + 1, max_retries)
+
+                    # The downloader uses blocking HTTP, so it runs in a worker thread
+                    await asyncio.wait_for(
+                        asyncio.to_thread(self._fetch_comments, video_id, output_file, cancel),
+                        timeout=180  # 3 minute timeout per video
+                    )
+
+                self.logger.info("Successfully downloaded comments for %s", video_id)
+                return True
+
+            except asyncio.TimeoutError:
+                cancel.set()
+                self.logger.warning("Timeout downloading comments for %s", video_id)
             except Exception as e:
-                self.logger.warning(f"Error downloading {video_id}: {e}")
+                self.logger.warning("Error downloading %s: %s", video_id, e)
 
-            # Wait before retry (if not last attempt)
+            # Wait before retry (if not last attempt), without holding a download slot
             if attempt < max_retries - 1:
                 delay = retry_delays[attempt]
-                self.logger.info(f"Waiting {delay}s before retry...")
-                time.sleep(delay)
+                self.logger.info("Waiting %ds before retry...", delay)
+                await asyncio.sleep(delay)
 
-        self.logger.error(f"Failed to download comments for {video_id} after {max_retries} attempts")
+        self.logger.error("Failed to download comments for %s after %d attempts", video_id, max_retries)
         return False
 
+    async def _run_async(self, pending_ids: list) -> list:
+        """
+        Download all pending videos concurrently.
+
+        Args:
+            pending_ids: Video IDs to download
+
+        Returns:
+            List with one success flag (or raised exception) per video ID
+        """
+        sem = asyncio.Semaphore(self.max_concurrency)
+        limiter = AsyncLimiter(max_rate=self.requests_per_minute, time_period=60)
+        total = len(pending_ids)
+        done = 0
+
+        async def process(video_id: str) -> bool:
+            nonlocal done
+            success = await self._download_comments_async(video_id, sem, limiter)
+            # save_progress is synchronous, so writes never interleave on the event loop
+            self.save_progress(video_id, success)
+            done += 1
+            self.logger.info("Processed [%d/%d]: %s", done, total, video_id)
+            return success
+
+        return await asyncio.gather(*[process(vid) for vid in pending_ids], return_exceptions=True)
+
     def run(self, max_videos: int = None) -> dict:
         """
         Main execution logic with checkpoint/resume support.
@@ -206,8 +386,9 @@ class YouTubeCommentCollector:
         # Load checkpoint
         completed = self.load_progress()
 
-        # Filter out already completed videos
-        pending_ids = [vid for vid in video_ids if vid not in completed]
+        # Filter out already completed videos and ones that keep failing
+        given_up = self.load_given_up()
+        pending_ids = [vid for vid in video_ids if vid not in completed and vid not in given_up]
 
         # Apply max_videos limit
         if max_videos:
@@ -217,24 +398,15 @@ class YouTubeCommentCollector:
         self.logger.info(f"Already completed: {len(completed)}")
         self.logger.info(f"To process: {len(pending_ids)}")
 
-        # Process videos
-        success_count = 0
-        failed_count = 0
-
-        for i, video_id in enumerate(pending_ids, 1):
-            self.logger.info(f"Processing [{i}/{len(pending_ids)}]: {video_id}")
+        # Process videos concurrently
+        results = asyncio.run(self._run_async(pending_ids)) if pending_ids else []
 
-            success = self.download_comments(video_id)
-            self.save_progress(video_id, success)
-
-            if success:
-                success_count += 1
-            else:
-                failed_count += 1
+        for video_id, result in zip(pending_ids, results):
+            if isinstance(result, Exception):
+                self.logger.error("Unexpected error processing %s: %s", video_id, result)
 
-            # Small delay between videos to avoid rate limiting
-            if i < len(pending_ids):
-                time.sleep(0.5)
+        success_count = sum(1 for result in results if result is True)
+        failed_count = len(results) - success_count
 
         # Summary
         summary = {
@@ -262,13 +434,22 @@ def main():
     parser = argparse.ArgumentParser(description="Download YouTube comments from a channel")
     parser.add_argument("channel_url", help="YouTube channel URL")
     parser.add_argument("--max-videos", type=int, default=None, help="Maximum videos to process")
-    parser.add_argument("--output-dir", default="data/raw_json", help="Output directory for JSON files")
+    parser.add_argument("--output-dir", default=None,
+                        help="Output directory (default: data/raw_parquet, or data/raw_json with --json)")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="Maximum concurrent downloads")
+    parser.add_argument("--json", action="store_true", help="Write one JSON Lines file per video (debugging)")
+    parser.add_argument("--max-failed-runs", type=int, default=3,
+                        help="Stop retrying a video after it failed this many runs")
 
     args = parser.parse_args()
 
+    output_format = "json" if args.json else "parquet"
     collector = YouTubeCommentCollector(
         channel_url=args.channel_url,
-        output_dir=args.output_dir
+        output_dir=args.output_dir or f"data/raw_{output_format}",
+        max_concurrency=args.max_concurrency,
+        output_format=output_format,
+        max_failed_runs=args.max_failed_runs
     )
     collector.run(max_videos=args.max_videos)
 
@@ -0,0 +1,66 @@
+"""
+Logging Module - Stage Logger Setup
+
+Shared logging configuration for the pipeline stages (collect, processor,
+analyzer, visualizer): console output plus a per-run log file written by a
+background thread.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+from pathlib import Path
+from datetime import datetime
+
+
+def setup_stage_logger(name: str, log_dir: Path, prefix: str) -> logging.Logger:
+    """
+    Configure logging to console and, via a background thread, to this run's log file.
+
+    Args:
+        name: Logger name (the calling module's __name__)
+        log_dir: Directory for the log file
+        prefix: Log file name prefix, e.g. "collect" for collect_<timestamp>.log
+
+    Returns:
+        The configured logger
+    """
+    log_file = Path(log_dir) / f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+    # The format uses neither field, so skip collecting them for every record
+    logging.logProcesses = logging.logThreads = False
+    logging.raiseExceptions = False
+
+    # basicConfig is a no-op once any stage has configured the root logger, so
+    # each instance attaches its own handlers to the module logger, shutting
+    # down those of an earlier instance
+    logger = logging.getLogger(name)
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        listener = getattr(handler, 'listener', None)
+        if listener is not None:
+            atexit.unregister(listener.stop)
+            listener.stop()
+            for target in listener.handlers:
+                target.close()
+        handler.close()
+
+    # File writes happen on the listener thread, off the hot loop
+    file_handler = logging.FileHandler(log_file, encoding='utf-8')
+    file_handler.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.listener = listener
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+    logger.addHandler(queue_handler)
+    logger.addHandler(console_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False  # root handlers would print every message twice
+    return logger
@@ -1,34 +1,75 @@
 """
 Data Processing Module - Comment Processor
 
-Consolidates JSON comment files into a single CSV dataset with cleaning operations.
+Consolidates the raw comment Parquet dataset (or legacy JSON comment files)
+into a single zstd-compressed Parquet (or CSV) dataset with cleaning operations.
 """
 
 import os
+import re
 import json
-import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    # Optional: the stdlib parser also accepts bytes, just slower
+    json_loads = json.loads
+
+from logging_setup import setup_stage_logger
+
+# Any non-whitespace character; emoji-only comments count as content
+_NON_BLANK_RE = re.compile(r"\S")
+_WHITESPACE_RUN_RE = re.compile(r"\s+")
+# Text that is not already normalized: any whitespace other than a plain space,
+# a double space, or a leading/trailing space. The class lists the characters
+# literally so Arrow's RE2 (ASCII-only \s) flags the same rows as Python's re.
+_OTHER_WHITESPACE = ''.join(c for c in map(chr, range(0x3001)) if c.isspace() and c != ' ')
+_UNNORMALIZED_WS_RE = re.compile(f"[{_OTHER_WHITESPACE}]|  |^ | $")
+
+
+def _count_text(value) -> str:
+    """
+    Normalize a votes/replies value to its display string ("1.2K").
+
+    Missing keys, nulls and ints from older files would otherwise leave a
+    mixed-type column that Parquet cannot store.
+    """
+    return '0' if value is None else str(value)
 
 
 class CommentProcessor:
-    """Processes raw JSON comment files into a cleaned CSV dataset."""
+    """Processes raw comment files into a cleaned Parquet dataset."""
 
-    def __init__(self, raw_dir: str = "data/raw_json",
-                 output_path: str = "data/merged_data.csv",
+    # Columns produced by load_json_files, in output order
+    FIELDS = ['video_id', 'text', 'votes', 'replies', 'time', 'author', 'cid']
+    # Low-cardinality columns stored as integer codes instead of one string per row
+    CATEGORICAL_FIELDS = ['video_id', 'author']
+
+    def __init__(self, raw_dir: str = "data/raw_parquet",
+                 output_path: str = "data/cleaned_data.parquet",
                  metadata_path: str = "data/video_metadata.csv",
-                 log_dir: str = "logs"):
+                 log_dir: str = "logs",
+                 legacy_json_dir: str = "data/raw_json"):
         """
         Initialize the processor.
 
         Args:
-            raw_dir: Directory containing raw JSON files
-            output_path: Path for the output CSV file
+            raw_dir: Root of the raw comment Parquet dataset, or a directory of JSON files
+            output_path: Path for the output file (Parquet, or CSV if it ends in .csv)
             log_dir: Directory for log files
+            legacy_json_dir: Directory of per-video JSON files from earlier collector
+                runs, read alongside raw_dir (None to skip)
         """
         self.raw_dir = Path(raw_dir)
+        self.legacy_json_dir = Path(legacy_json_dir) if legacy_json_dir else None
         self.output_path = Path(output_path)
         self.metadata_path = Path(metadata_path)
         self.log_dir = Path(log_dir)
@@ -38,135 +79,166 @@ class CommentProcessor:
         self.log_dir.mkdir(parents=True, exist_ok=True)
 
         # Setup logging
-        self._setup_logging()
-
-    def _setup_logging(self):
-        """Configure logging to file and console."""
-        log_file = self.log_dir / f"processor_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
-
-    def load_json_files(self) -> list:
-        """
-        Load all JSON files from the raw directory.
+        self.logger = setup_stage_logger(__name__, self.log_dir, "processor")
 
-        Returns:
-            List of tuples (video_id, comments_list)
-        """
-        self.logger.info(f"Loading JSON files from: {self.raw_dir}")
+    def _parquet_files(self) -> list:
+        """List the partition files of the collector's video_id-partitioned Parquet dataset."""
+        return sorted(str(path) for path in self.raw_dir.glob("video_id=*/*.parquet"))
 
-        all_data = []
-        json_files = list(self.raw_dir.glob("*.json"))
+    def is_parquet_dataset(self) -> bool:
+        """Check whether raw_dir holds the collector's video_id-partitioned Parquet dataset."""
+        return bool(self._parquet_files())
 
-        if not json_files:
-            self.logger.warning("No JSON files found!")
-            return all_data
+    def load_parquet_dataset(self) -> pd.DataFrame:
+        """
+        Read the core comment fields from the raw Parquet dataset in one scan.
 
-        self.logger.info(f"Found {len(json_files)} JSON files")
+        Returns:
+            DataFrame with the same columns as load_json_files
+        """
+        self.logger.info(f"Loading Parquet dataset from: {self.raw_dir}")
+
+        # Explicit string partition type: an all-digit video ID must not be inferred as an int
+        partitioning = ds.partitioning(pa.schema([('video_id', pa.string())]), flavor='hive')
+        # Explicit file list: stray files in the partition directories (such as an
+        # interrupted download's temp file) are not part of the dataset
+        dataset = ds.dataset(self._parquet_files(), format='parquet', partitioning=partitioning,
+                             partition_base_dir=str(self.raw_dir))
+        df = dataset.to_table(columns=self.FIELDS).to_pandas()
+
+        df['text'] = df['text'].fillna('')
+        df['votes'] = df['votes'].fillna('0')
+        df['replies'] = df['replies'].fillna('0')
+        for col in ('time', 'author', 'cid'):
+            df[col] = df[col].fillna('')
+        df = df.astype({col: 'category' for col in self.CATEGORICAL_FIELDS})
+
+        self.logger.info(f"Loaded {len(df)} comments from {df['video_id'].nunique()} videos")
+        return df
 
-        for json_file in json_files:
-            video_id = json_file.stem  # filename without extension
-            try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    # youtube-comment-downloader outputs one JSON object per line
-                    comments = []
-                    for line in f:
-                        line = line.strip()
-                        if line:
-                            try:
-                                comment = json.loads(line)
-                                comments.append(comment)
-                            except json.JSONDecodeError:
-                                continue
-
-                    if comments:
-                        all_data.append((video_id, comments))
-                        self.logger.info(f"Loaded {len(comments)} comments from {video_id}")
-
-            except Exception as e:
-                self.logger.error(f"Error loading {json_file}: {e}")
-
-        return all_data
-
-    def extract_fields(self, all_data: list) -> pd.DataFrame:
+    def load_json_files(self, json_dir: Path = None) -> pd.DataFrame:
         """
-        Extract core fields from comments into a DataFrame.
+        Load all JSON files from a directory into a DataFrame.
 
         Args:
-            all_data: List of tuples (video_id, comments_list)
+            json_dir: Directory of {video_id}.json files (default: raw_dir)
 
         Returns:
-            DataFrame with extracted fields
+            DataFrame with the FIELDS columns (empty if no comments were found)
         """
-        self.logger.info("Extracting core fields from comments")
+        json_dir = self.raw_dir if json_dir is None else Path(json_dir)
+        self.logger.info(f"Loading JSON files from: {json_dir}")
 
-        records = []
-        for video_id, comments in all_data:
-            for comment in comments:
-                record = {
-                    'video_id': video_id,
-                    'text': comment.get('text', ''),
-                    'votes': comment.get('votes', 0),
-                    'replies': comment.get('replies', 0),
-                    'time': comment.get('time', ''),
-                    'author': comment.get('author', ''),
-                    'cid': comment.get('cid', '')  # comment ID for deduplication
-                }
-                records.append(record)
-
-        df = pd.DataFrame(records)
+        # Records stream straight into the frame; no per-file intermediate list is kept
+        df = pd.DataFrame.from_records(self._iter_records(json_dir), columns=self.FIELDS)
+        df = df.astype({col: 'category' for col in self.CATEGORICAL_FIELDS})
         self.logger.info(f"Extracted {len(df)} comments total")
         return df
 
-    def remove_duplicates(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _iter_records(self, json_dir: Path):
         """
-        Remove duplicate comments based on comment ID and text.
+        Yield one record tuple per comment across all JSON files, in file order.
 
         Args:
-            df: Input DataFrame
+            json_dir: Directory of {video_id}.json files
 
-        Returns:
-            DataFrame with duplicates removed
+        Yields:
+            Tuples of the FIELDS values
         """
-        original_count = len(df)
+        json_files = list(json_dir.glob("*.json"))
 
-        # Remove duplicates by comment ID first (if available)
-        if 'cid' in df.columns:
-            df = df.drop_duplicates(subset=['cid'], keep='first')
+        if not json_files:
+            self.logger.warning("No JSON files found!")
+            return
 
-        # Also remove duplicates by text content (same text, different IDs)
-        df = df.drop_duplicates(subset=['text'], keep='first')
+        self.logger.info(f"Found {len(json_files)} JSON files")
 
-        removed = original_count - len(df)
-        self.logger.info(f"Removed {removed} duplicate comments ({len(df)} remaining)")
-        return df
+        # Reads overlap on a thread pool; map keeps the file order
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+        loaded = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for records in pool.map(self._parse_file, json_files):
+                loaded += bool(records)
+                yield from records
+
+        # One summary line instead of a locked handler call per file from the workers
+        self.logger.info(f"Loaded comments from {loaded}/{len(json_files)} files")
 
-    def remove_emoji_only(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _parse_file(self, json_file: Path) -> list:
         """
-        Remove comments that are completely empty or whitespace-only.
-        Emoji-only comments and low-frequency words are preserved.
+        Read and parse one JSON Lines comment file.
 
         Args:
-            df: Input DataFrame
+            json_file: Path of a {video_id}.json file
 
         Returns:
-            DataFrame with blank-only comments removed
+            List of FIELDS tuples; empty if the file failed to load
         """
-        original_count = len(df)
+        video_id = json_file.stem  # filename without extension
+        records = []
+        try:
+            # Read raw bytes: orjson parses UTF-8 directly, without decoding to str first
+            with open(json_file, 'rb') as f:
+                lines = f.read().splitlines()
+
+            # youtube-comment-downloader outputs one JSON object per line; each
+            # comment dict is reduced to a tuple right away so it can be freed
+            for line in lines:
+                line = line.strip()
+                if line:
+                    try:
+                        comment = json_loads(line)
+                    except ValueError:  # JSONDecodeError of either parser
+                        continue
+                    get = comment.get
+                    records.append((
+                        video_id,
+                        get('text', ''),
+                        _count_text(get('votes')),
+                        _count_text(get('replies')),
+                        get('time', ''),
+                        get('author', ''),
+                        get('cid', '')  # comment ID for deduplication
+                    ))
+
+        except Exception as e:
+            self.logger.error(f"Error loading {json_file}: {e}")
+            records = []
+
+        return records
+
+    def load_raw_comments(self) -> pd.DataFrame:
+        """
+        Load the Parquet dataset and/or JSON files of raw_dir, plus legacy JSON files.
 
-        df = df[df['text'].apply(lambda t: isinstance(t, str) and t.strip() != '')]
+        Videos collected as JSON before the switch to Parquet are marked complete
+        in the progress database and never downloaded again, so their comments
+        are only available from legacy_json_dir.
 
-        removed = original_count - len(df)
-        self.logger.info(f"Removed {removed} blank comments ({len(df)} remaining)")
-        return df
+        Returns:
+            DataFrame with the FIELDS columns (empty if no comments were found)
+        """
+        frames = []
+        if self.is_parquet_dataset():
+            frames.append(self.load_parquet_dataset())
+
+        json_dirs = [self.raw_dir]
+        if self.legacy_json_dir is not None and self.legacy_json_dir.resolve() != self.raw_dir.resolve():
+            json_dirs.append(self.legacy_json_dir)
+        for json_dir in json_dirs:
+            if any(json_dir.glob("*.json")):
+                frames.append(self.load_json_files(json_dir))
+
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            self.logger.warning(f"No raw comments found in {' or '.join(map(str, json_dirs))}")
+            return pd.DataFrame()
+        if len(frames) == 1:
+            return frames[0]
+
+        # Categories differ per source; concat falls back to strings, so re-encode
+        df = pd.concat(frames, ignore_index=True)
+        return df.astype({col: 'category' for col in self.CATEGORICAL_FIELDS})
 
     def merge_metadata(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -185,12 +257,16 @@ class CommentProcessor:
             df['ai_explicit'] = False
             return df
 
-        metadata = pd.read_csv(self.metadata_path, encoding='utf-8')
+        metadata = pd.read_csv(self.metadata_path, encoding='utf-8',
+                               usecols=['video_id', 'video_title', 'title_hashtags', 'ai_explicit'])
         self.logger.info(f"Loaded metadata for {len(metadata)} videos")
 
+        # Same categories on both keys: the join runs on codes and video_id stays categorical
+        if isinstance(df['video_id'].dtype, pd.CategoricalDtype):
+            metadata['video_id'] = metadata['video_id'].astype(df['video_id'].dtype)
+
         before_cols = set(df.columns)
-        df = df.merge(metadata[['video_id', 'video_title', 'title_hashtags', 'ai_explicit']],
-                       on='video_id', how='left')
+        df = df.merge(metadata, on='video_id', how='left')
 
         df['video_title'] = df['video_title'].fillna('')
         df['title_hashtags'] = df['title_hashtags'].fillna('')
@@ -201,60 +277,93 @@ class CommentProcessor:
 
         return df
 
-    def clean_text(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _clean_and_filter(self, df: pd.DataFrame) -> pd.DataFrame:
         """
-        Clean comment text (normalize whitespace, etc.).
+        Normalize whitespace, then drop blank and duplicate comments in one pass.
+
+        Duplicates are removed by comment ID first, then by text hash among
+        the remaining comments (same text, different IDs). Emoji-only comments
+        and low-frequency words are preserved.
 
         Args:
             df: Input DataFrame
 
         Returns:
-            DataFrame with cleaned text
+            Cleaned DataFrame
         """
-        self.logger.info("Cleaning comment text")
+        original_count = len(df)
 
-        # Normalize whitespace
-        df['text'] = df['text'].str.replace(r'\s+', ' ', regex=True).str.strip()
+        # Normalize whitespace; most comments are already clean, so only
+        # the rows the cheap probe flags go through the substitution
+        text = df['text']
+        needs_fix = text.str.contains(_UNNORMALIZED_WS_RE, na=False).to_numpy()
+        if needs_fix.any():
+            text = text.copy()
+            text[needs_fix] = [_WHITESPACE_RUN_RE.sub(' ', s).strip() for s in text[needs_fix]]
+
+        # Keep mask over all rows: non-blank first, then first occurrence per cid, then per text
+        keep = text.str.contains(_NON_BLANK_RE, na=False).to_numpy(copy=True)
+        blank_count = original_count - int(keep.sum())
+        # Text is compared by its 64-bit hash rather than as full strings
+        keys = [df['cid']] if 'cid' in df.columns else []
+        keys.append(pd.util.hash_pandas_object(text, index=False))
+        for key in keys:
+            rows = np.flatnonzero(keep)
+            keep[rows[pd.Series(key.to_numpy()[rows]).duplicated().to_numpy()]] = False
+
+        df['text'] = text
+        df = df[keep]
+
+        duplicate_count = original_count - blank_count - len(df)
+        self.logger.info(f"Removed {blank_count} blank and {duplicate_count} duplicate comments "
+                         f"({len(df)} remaining)")
+        return df
 
-        # Remove empty comments
-        df = df[df['text'].str.len() > 0]
+    def _write_csv(self, df: pd.DataFrame):
+        """
+        Write the cleaned comments as CSV using Arrow's C++ writer.
 
-        return df
+        Args:
+            df: Cleaned DataFrame
+        """
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            # Mixed-type object columns (e.g. ints in a text column) have no Arrow type
+            self.logger.warning(f"Arrow conversion failed, writing CSV with pandas: {e}")
+            df.to_csv(self.output_path, index=False, encoding='utf-8')
+            return
+        pa_csv.write_csv(table, self.output_path)
 
     def run(self) -> pd.DataFrame:
         """
         Main execution logic.
 
         Returns:
-            Cleaned DataFrame (also saved to CSV)
+            Cleaned DataFrame (also saved to output_path)
         """
         self.logger.info("=" * 50)
         self.logger.info("Starting Comment Processing")
         self.logger.info("=" * 50)
 
-        # Step 1: Load JSON files
-        all_data = self.load_json_files()
-        if not all_data:
+        # Step 1-2: Load raw comments and extract fields
+        df = self.load_raw_comments()
+
+        if df.empty:
             self.logger.error("No data to process. Exiting.")
             return pd.DataFrame()
 
-        # Step 2: Extract fields
-        df = self.extract_fields(all_data)
-
         # Step 3: Merge video metadata
         df = self.merge_metadata(df)
 
-        # Step 4: Remove duplicates
-        df = self.remove_duplicates(df)
-
-        # Step 5: Remove emoji-only comments
-        df = self.remove_emoji_only(df)
-
-        # Step 6: Clean text
-        df = self.clean_text(df)
+        # Step 4: Clean text, remove blank and duplicate comments
+        df = self._clean_and_filter(df)
 
-        # Step 7: Save to CSV
-        df.to_csv(self.output_path, index=False, encoding='utf-8')
+        # Step 5: Save (Parquet by default, CSV if requested)
+        if self.output_path.suffix == '.csv':
+            self._write_csv(df)
+        else:
+            df.to_parquet(self.output_path, engine='pyarrow', compression='zstd', index=False)
         self.logger.info(f"Saved {len(df)} comments to {self.output_path}")
 
         # Summary
@@ -272,15 +381,20 @@ def main():
     """Entry point for standalone execution."""
     import argparse
 
-    parser = argparse.ArgumentParser(description="Process raw JSON comments into CSV")
-    parser.add_argument("--raw-dir", default="data/raw_json", help="Directory with raw JSON files")
-    parser.add_argument("--output", default="data/merged_data.csv", help="Output CSV path")
+    parser = argparse.ArgumentParser(description="Process raw comments into a cleaned dataset")
+    parser.add_argument("--raw-dir", default="data/raw_parquet",
+                        help="Raw comment Parquet dataset or directory with JSON files")
+    parser.add_argument("--output", default="data/cleaned_data.parquet",
+                        help="Output path (Parquet, or CSV if it ends in .csv)")
+    parser.add_argument("--legacy-json-dir", default="data/raw_json",
+                        help="Directory of JSON files from earlier collector runs, read alongside --raw-dir")
 
     args = parser.parse_args()
 
     processor = CommentProcessor(
         raw_dir=args.raw_dir,
-        output_path=args.output
+        output_path=args.output,
+        legacy_json_dir=args.legacy_json_dir
     )
     processor.run()
 
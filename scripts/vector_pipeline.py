@@ -19,11 +19,14 @@ logger = logging.getLogger(__name__)
 
 # ── 1. Preprocessing ──────────────────────────────────────────────────────────
 
-def load_and_preprocess(csv_path: str = "data/merged_data.csv") -> pd.DataFrame:
-    """Load CSV, de-identify authors, tokenize + lemmatize with spaCy."""
+def load_and_preprocess(csv_path: str = "data/merged_data.parquet") -> pd.DataFrame:
+    """Load CSV/Parquet, de-identify authors, tokenize + lemmatize with spaCy."""
     nlp = spacy.load("en_core_web_sm", disable=["parser", "ner"])
 
-    df = pd.read_csv(csv_path)
+    if str(csv_path).endswith(".parquet"):
+        df = pd.read_parquet(csv_path)
+    else:
+        df = pd.read_csv(csv_path)
     df["author"] = "user_" + pd.factorize(df["author"])[0].astype(str)  # de-identify
 
     texts = df["text"].fillna("").astype(str).tolist()
@@ -289,7 +292,7 @@ def encode_with_sbert(texts: list[str], model_name: str = "all-MiniLM-L6-v2") ->
 
 # ── 7. Main pipeline ──────────────────────────────────────────────────────────
 
-def run(csv_path: str = "data/merged_data.csv",
+def run(csv_path: str = "data/merged_data.parquet",
         n_clusters: int = 10,
         use_sbert: bool = False) -> pd.DataFrame:
 
@@ -340,7 +343,7 @@ def run(csv_path: str = "data/merged_data.csv",
 if __name__ == "__main__":
     import argparse
     p = argparse.ArgumentParser()
-    p.add_argument("--csv", default="data/merged_data.csv")
+    p.add_argument("--csv", default="data/merged_data.parquet")
     p.add_argument("--clusters", type=int, default=10)
     p.add_argument("--sbert", action="store_true", help="Use SBERT for Stage 2")
     args = p.parse_args()
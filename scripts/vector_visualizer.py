@@ -92,7 +92,7 @@ def plot_clusters(matrix: np.ndarray, labels: np.ndarray,
         )
         fig_px.update_traces(marker=dict(size=4))
         html_path = f"{out_dir}/html/clusters_{method}.html"
-        fig_px.write_html(html_path)
+        fig_px.write_html(html_path, include_plotlyjs="cdn", config={"responsive": True})
         logger.info(f"Saved {html_path}")
     except ImportError:
         logger.warning("plotly not installed; skipping HTML output")
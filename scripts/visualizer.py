@@ -5,29 +5,52 @@ Generates visualizations for sentiment analysis and linguistic complexity.
 Outputs both PNG (static) and HTML (interactive) formats.
 """
 
-import logging
+import re
 from pathlib import Path
-from datetime import datetime
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 import matplotlib.pyplot as plt
 import seaborn as sns
 import plotly.express as px
 import plotly.graph_objects as go
 from wordcloud import WordCloud, STOPWORDS
+from wordcloud.tokenization import process_tokens
+
+from logging_setup import setup_stage_logger
+
+
+# WordCloud's default tokenization (min_word_length=0), trailing 's removed
+_WORDCLOUD_TOKEN_RE = re.compile(r"\w[\w']*")
+_POSSESSIVE_RE = re.compile(r"'[sS]$")
 
 
 class CommentVisualizer:
     """Generates visualizations from analyzed comment data."""
 
-    def __init__(self, input_path: str = "data/merged_data.csv",
+    # Columns consumed by the charts; everything else is skipped on load
+    COLUMNS = ['text', 'votes', 'word_count', 'sentiment_label', 'sentiment_score', 'lexical_density']
+    # Above this many comments the engagement chart is hex-binned (PNG) and sampled (HTML)
+    MAX_SCATTER_POINTS = 20_000
+    # Chart color per sentiment label; anything else is drawn gray
+    SENTIMENT_COLORS = {
+        'POSITIVE': '#2ecc71',
+        'NEGATIVE': '#e74c3c',
+        'NEUTRAL': '#f1c40f',
+        'UNKNOWN': '#95a5a6'
+    }
+
+    def __init__(self, input_path: str = "data/merged_data.parquet",
                  output_dir: str = "output",
                  log_dir: str = "logs"):
         """
         Initialize the visualizer.
 
         Args:
-            input_path: Path to analyzed CSV file
+            input_path: Path to analyzed Parquet or CSV file
             output_dir: Base directory for output files
             log_dir: Directory for log files
         """
@@ -46,32 +69,69 @@ class CommentVisualizer:
         self.df = None
 
         # Setup logging
-        self._setup_logging()
+        self.logger = setup_stage_logger(__name__, self.log_dir, "visualizer")
 
         # Set style for matplotlib
         plt.style.use('seaborn-v0_8-whitegrid')
         sns.set_palette("husl")
 
-    def _setup_logging(self):
-        """Configure logging to file and console."""
-        log_file = self.log_dir / f"visualizer_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
-
     def load_data(self):
-        """Load the analyzed data."""
+        """
+        Load the analyzed data.
+
+        CSV input is parsed with the multithreaded Arrow reader and the chart
+        columns are cached in a Parquet file next to it; later runs read the
+        cache as long as it is newer than the CSV.
+        """
         self.logger.info(f"Loading data from: {self.input_path}")
-        self.df = pd.read_csv(self.input_path)
+        if self.input_path.suffix == '.parquet':
+            available = pq.read_schema(self.input_path).names
+            columns = [col for col in self.COLUMNS if col in available]
+            self.df = pq.read_table(self.input_path, columns=columns).to_pandas()
+        else:
+            cache_path = self.input_path.with_suffix('.visualizer.parquet')
+            if cache_path.exists() and cache_path.stat().st_mtime >= self.input_path.stat().st_mtime:
+                self.logger.info(f"Using cached Parquet copy: {cache_path}")
+                self.df = pd.read_parquet(cache_path)
+            else:
+                self.df = self._read_csv(cache_path)
+        # Four labels: counts, comparisons and color lookups run on integer codes
+        # (unanalyzed input has no labels; run() reports the missing columns)
+        if 'sentiment_label' in self.df.columns:
+            self.df['sentiment_label'] = self.df['sentiment_label'].astype('category')
         self.logger.info(f"Loaded {len(self.df)} comments")
 
+    def _read_csv(self, cache_path: Path) -> pd.DataFrame:
+        """
+        Read the chart columns of a CSV input and cache them as Parquet.
+
+        Args:
+            cache_path: Parquet file to write the parsed columns to
+
+        Returns:
+            DataFrame with the available chart columns
+        """
+        header = pd.read_csv(self.input_path, nrows=0).columns
+        columns = [col for col in self.COLUMNS if col in header]
+        try:
+            table = pa_csv.read_csv(
+                self.input_path,
+                convert_options=pa_csv.ConvertOptions(
+                    include_columns=columns,
+                    column_types={'text': pa.string(), 'votes': pa.string()}
+                )
+            )
+        except pa.ArrowInvalid as e:
+            # Type inference is done on the first block; fall back on mixed columns
+            self.logger.warning(f"Arrow CSV reader failed, falling back to pandas: {e}")
+            return pd.read_csv(self.input_path, usecols=columns)
+
+        try:
+            pq.write_table(table, cache_path, compression='zstd')
+        except OSError as e:
+            self.logger.warning(f"Could not write Parquet cache {cache_path}: {e}")
+        return table.to_pandas()
+
     def save_png(self, fig, name: str):
         """Save matplotlib figure as PNG."""
         path = self.png_dir / f"{name}.png"
@@ -80,9 +140,9 @@ class CommentVisualizer:
         plt.close(fig)
 
     def save_html(self, fig, name: str):
-        """Save plotly figure as HTML."""
+        """Save plotly figure as HTML (plotly.js is loaded from the CDN, not inlined)."""
         path = self.html_dir / f"{name}.html"
-        fig.write_html(str(path))
+        fig.write_html(str(path), include_plotlyjs='cdn', config={'responsive': True})
         self.logger.info(f"Saved HTML: {path}")
 
     def plot_sentiment_pie(self):
@@ -96,21 +156,22 @@ class CommentVisualizer:
 
         # Calculate sentiment counts
         sentiment_counts = self.df['sentiment_label'].value_counts()
+        sentiment_counts = sentiment_counts[sentiment_counts > 0]  # unused categories
 
-        # Colors
-        colors_mpl = ['#2ecc71', '#e74c3c', '#95a5a6']  # green, red, gray
-        colors_plotly = ['#2ecc71', '#e74c3c', '#95a5a6']
+        # Shared by both renders; colors follow the label, not the count order
+        labels = sentiment_counts.index.astype(str).tolist()
+        values = sentiment_counts.to_numpy()
+        colors = [self.SENTIMENT_COLORS.get(label, '#95a5a6') for label in labels]
 
-        # Matplotlib version
+        # Matplotlib version (no shadow: it draws every wedge twice)
         fig_mpl, ax = plt.subplots(figsize=(10, 8))
 
         wedges, texts, autotexts = ax.pie(
-            sentiment_counts.values,
-            labels=sentiment_counts.index,
+            values,
+            labels=labels,
             autopct='%1.1f%%',
-            colors=colors_mpl[:len(sentiment_counts)],
-            explode=[0.02] * len(sentiment_counts),
-            shadow=True,
+            colors=colors,
+            explode=[0.02] * len(labels),
             startangle=90
         )
 
@@ -126,10 +187,10 @@ class CommentVisualizer:
 
         # Plotly version (interactive)
         fig_plotly = go.Figure(data=[go.Pie(
-            labels=sentiment_counts.index.tolist(),
-            values=sentiment_counts.values.tolist(),
+            labels=labels,
+            values=values.tolist(),
             hole=0.3,
-            marker_colors=colors_plotly[:len(sentiment_counts)],
+            marker_colors=colors,
             textinfo='label+percent',
             textfont_size=14,
             hovertemplate="<b>%{label}</b><br>Count: %{value}<br>Percentage: %{percent}<extra></extra>"
@@ -158,33 +219,48 @@ class CommentVisualizer:
         """
         self.logger.info("Generating engagement scatter plot...")
 
-        # Prepare data
-        df_plot = self.df.copy()
+        # Convert sentiment to signed score (positive = +score, negative = -score, neutral = 0)
+        labels = self.df['sentiment_label']
+        sign = np.where((labels == 'POSITIVE').to_numpy(), 1.0,
+                        np.where((labels == 'NEUTRAL').to_numpy(), 0.0, -1.0))
+        x = self.df['lexical_density'].to_numpy()
+        signed = sign * self.df['sentiment_score'].to_numpy()
 
-        # Convert sentiment to signed score (positive = +score, negative = -score)
-        df_plot['signed_sentiment'] = df_plot.apply(
-            lambda row: row['sentiment_score'] if row['sentiment_label'] == 'POSITIVE'
-            else -row['sentiment_score'],
-            axis=1
-        )
+        # Large corpora: hex-bin the static chart and sample the interactive one,
+        # since per-point rendering cost (and HTML size) grows with every comment
+        large = len(x) > self.MAX_SCATTER_POINTS
 
         # Matplotlib version
         fig_mpl, ax = plt.subplots(figsize=(12, 8))
 
-        # Color by sentiment label
-        colors = df_plot['sentiment_label'].map({
-            'POSITIVE': '#2ecc71',
-            'NEGATIVE': '#e74c3c',
-            'UNKNOWN': '#95a5a6'
-        })
-
-        scatter = ax.scatter(
-            df_plot['lexical_density'],
-            df_plot['signed_sentiment'],
-            c=colors,
-            alpha=0.5,
-            s=30
-        )
+        if large:
+            hexbin = ax.hexbin(
+                x,
+                signed,
+                C=signed,
+                reduce_C_function=np.mean,
+                gridsize=80,
+                cmap='RdYlGn',
+                vmin=-1,
+                vmax=1,
+                mincnt=1
+            )
+            fig_mpl.colorbar(hexbin, ax=ax, label='Mean signed sentiment')
+        else:
+            # Color by sentiment label: one palette entry per category, gathered by code
+            # (the extra last entry is picked up by code -1, i.e. a missing label)
+            labels_cat = labels.cat
+            palette = np.array([self.SENTIMENT_COLORS.get(label, '#95a5a6')
+                                for label in labels_cat.categories] + ['#95a5a6'])
+            colors = palette[labels_cat.codes.to_numpy()]
+
+            ax.scatter(
+                x,
+                signed,
+                c=colors,
+                alpha=0.5,
+                s=30
+            )
 
         ax.axhline(y=0, color='gray', linestyle='--', alpha=0.5)
         ax.set_xlabel('Lexical Density (Engagement Depth)', fontsize=12)
@@ -193,27 +269,31 @@ class CommentVisualizer:
                      fontsize=14, fontweight='bold')
 
         # Add legend
-        from matplotlib.patches import Patch
-        legend_elements = [
-            Patch(facecolor='#2ecc71', label='Positive'),
-            Patch(facecolor='#e74c3c', label='Negative')
-        ]
-        ax.legend(handles=legend_elements, loc='upper right')
+        if not large:
+            from matplotlib.patches import Patch
+            legend_elements = [
+                Patch(facecolor='#2ecc71', label='Positive'),
+                Patch(facecolor='#e74c3c', label='Negative'),
+                Patch(facecolor='#f1c40f', label='Neutral')
+            ]
+            ax.legend(handles=legend_elements, loc='upper right')
 
         self.save_png(fig_mpl, "engagement_scatter")
 
-        # Plotly version (interactive)
+        # Plotly version (interactive): only the plotted and hover columns
+        hover_cols = ['text', 'votes', 'word_count']
+        df_plot = self.df[['lexical_density', 'sentiment_label'] + hover_cols].assign(signed_sentiment=signed)
+        if large:
+            self.logger.info(f"Sampling {self.MAX_SCATTER_POINTS} of {len(df_plot)} comments for the interactive chart")
+            df_plot = df_plot.sample(self.MAX_SCATTER_POINTS, random_state=0)
+
         fig_plotly = px.scatter(
             df_plot,
             x='lexical_density',
             y='signed_sentiment',
             color='sentiment_label',
-            color_discrete_map={
-                'POSITIVE': '#2ecc71',
-                'NEGATIVE': '#e74c3c',
-                'UNKNOWN': '#95a5a6'
-            },
-            hover_data=['text', 'votes', 'word_count'],
+            color_discrete_map=self.SENTIMENT_COLORS,
+            hover_data=hover_cols,
             opacity=0.6,
             title='User Engagement vs. Acceptance of AI-Generated Videos'
         )
@@ -250,9 +330,6 @@ class CommentVisualizer:
             self.logger.warning("No negative comments found for word cloud")
             return None
 
-        # Combine all negative comments
-        text = ' '.join(negative_comments.astype(str).tolist())
-
         # Extended stopwords
         stopwords = set(STOPWORDS)
         stopwords.update([
@@ -263,6 +340,17 @@ class CommentVisualizer:
             'see', 'know', 'think', 'want', 'get', 'got', 'going', 'go'
         ])
 
+        # Tokenize per comment (WordCloud's own rules) instead of joining one giant string
+        words = negative_comments.astype(str).str.findall(_WORDCLOUD_TOKEN_RE).explode().dropna()
+        words = words.str.replace(_POSSESSIVE_RE, '', regex=True)
+        words = words[~words.str.isdigit() & ~words.str.lower().isin(stopwords)]
+
+        # Merge case variants and plurals the same way WordCloud.generate does
+        frequencies, _ = process_tokens(words.tolist(), normalize_plurals=True)
+        if not frequencies:
+            self.logger.warning("No words left in negative comments for word cloud")
+            return None
+
         # Generate word cloud
         wordcloud = WordCloud(
             width=1200,
@@ -273,7 +361,7 @@ class CommentVisualizer:
             colormap='Reds',
             collocations=False,
             min_font_size=10
-        ).generate(text)
+        ).generate_from_frequencies(frequencies)
 
         # Create figure
         fig, ax = plt.subplots(figsize=(15, 10))
@@ -327,7 +415,7 @@ def main():
     import argparse
 
     parser = argparse.ArgumentParser(description="Generate visualizations from analyzed comments")
-    parser.add_argument("--input", default="data/merged_data.csv", help="Input CSV path")
+    parser.add_argument("--input", default="data/merged_data.parquet", help="Input Parquet or CSV path")
     parser.add_argument("--output-dir", default="output", help="Output directory")
 
     args = parser.parse_args()
@@ -0,0 +1,7 @@
+"""Shared pytest setup: make the pipeline modules in scripts/ importable."""
+
+import sys
+from pathlib import Path
+
+# Same layout main.py relies on: modules are imported by name from scripts/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
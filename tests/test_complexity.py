@@ -0,0 +1,105 @@
+"""Sanity-check the linguistic complexity metrics against textstat and each other."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import analyzer as analyzer_module
+from analyzer import CommentAnalyzer, _complexity_frame
+
+SAMPLES = [
+    "This video is honestly amazing and I love it.",
+    "The animation quality keeps getting better every single week. Great work!",
+    "I cannot believe people still think this is real footage.",
+    "Artificial intelligence generated content should always be clearly labelled for viewers.",
+    "Nice edit bro.",
+    "Why does everyone here sound so angry? It is just a funny clip.",
+    "The lighting, the movement and the voices are completely unnatural, "
+    "which makes the whole thing unsettling to watch.",
+    "My grandmother shared this with the entire family thinking it was genuine.",
+]
+
+
+# Scripts with non-ASCII case, combining marks and non-Latin punctuation
+MIXED_SCRIPT_SAMPLES = [
+    "Привет привет",
+    "ΓΕΙΑ γεια",
+    "مرحبا، مرحبا",
+    "नमस्ते दुनिया नमस्ते",
+    "İstanbul ISTANBUL",
+    "Straße STRASSE straße",
+    "日本語のテキスト、日本語。",
+    "Ünïcödé ÜNÏCÖDÉ",
+    "안녕하세요 안녕하세요",
+    "ＡＢＣ ａｂｃ",
+    "emoji 😂😂 don’t DON’T!!",
+    "hmm brb 10/10 pfft",
+    "",
+    None,
+]
+
+
+@pytest.fixture
+def analyzer(tmp_path):
+    return CommentAnalyzer(log_dir=tmp_path / "logs", cache_dir=tmp_path / "cache")
+
+
+@pytest.fixture
+def textstat():
+    return pytest.importorskip("textstat")
+
+
+@pytest.mark.parametrize("samples", [SAMPLES, MIXED_SCRIPT_SAMPLES], ids=["english", "mixed-script"])
+def test_numba_counts_match_pandas(samples):
+    if analyzer_module._complexity_kernel is None:
+        pytest.skip("numba is not installed")
+    s = pd.Series(samples, dtype=object)
+    numba_counts = analyzer_module._complexity_counts_numba(s)
+    pandas_counts = analyzer_module._complexity_counts_pandas(s)
+    for numba_count, pandas_count in zip(numba_counts, pandas_counts):
+        assert numba_count.tolist() == np.asarray(pandas_count).tolist()
+
+
+def test_word_count_matches_textstat(textstat):
+    frame = _complexity_frame(pd.Series(SAMPLES))
+    assert frame['word_count'].tolist() == [textstat.lexicon_count(text) for text in SAMPLES]
+
+
+def test_flesch_tracks_textstat(textstat):
+    """
+    Vowel groups have no silent-e rule, so syllables are overcounted and scores
+    run lower than textstat's dictionary-based ones. One extra syllable in a
+    three-word comment ("Nice edit bro.") costs 28 points; they must stay within
+    that and rank comments alike.
+    """
+    try:
+        reference = np.array([textstat.flesch_reading_ease(text) for text in SAMPLES])
+    except LookupError:
+        pytest.skip("textstat's syllable dictionary (NLTK cmudict) is not installed")
+
+    scores = _complexity_frame(pd.Series(SAMPLES))['flesch_reading_ease'].to_numpy()
+    assert np.abs(scores - reference).max() < 30
+    assert np.abs(scores - reference).mean() < 20
+    assert np.corrcoef(scores, reference)[0, 1] > 0.8
+
+
+def test_words_without_vowels_count_one_syllable(analyzer):
+    # 3 words, 3 syllables, 1 sentence
+    assert analyzer.calculate_complexity("hmm brb 10")['flesch_reading_ease'] == pytest.approx(
+        206.835 - 1.015 * 3 - 84.6 * 1
+    )
+
+
+def test_single_text_matches_batch(analyzer):
+    samples = SAMPLES + MIXED_SCRIPT_SAMPLES[:-2]
+    frame = _complexity_frame(pd.Series(samples))
+    for text, row in zip(samples, frame.to_dict('records')):
+        assert analyzer.calculate_complexity(text) == pytest.approx(row)
+
+
+def test_empty_text_scores_zero(analyzer):
+    assert analyzer.calculate_complexity("") == {
+        'lexical_density': 0.0,
+        'flesch_reading_ease': 0.0,
+        'word_count': 0
+    }
@@ -0,0 +1,55 @@
+"""Freeze the no-signal labelling rules of the sentiment stage."""
+
+import pandas as pd
+import pytest
+
+from analyzer import _heuristic_labels
+
+
+def label(text):
+    """Label a single normalized (lowercased) comment."""
+    return _heuristic_labels(pd.Series([text], dtype=object))[0]
+
+
+@pytest.mark.parametrize("text", ["👍", "👍👍👍", "❤️", "😍🔥", "🔥 @someone"])
+def test_positive_emoji(text):
+    assert label(text) == 'POSITIVE'
+
+
+@pytest.mark.parametrize("text", ["👎", "😡😡", "🤮 https://example.com"])
+def test_negative_emoji(text):
+    assert label(text) == 'NEGATIVE'
+
+
+def test_mixed_emoji_is_neutral():
+    assert label("👍👎") == 'NEUTRAL'
+
+
+@pytest.mark.parametrize("text", [
+    "https://www.youtube.com/watch?v=abcdef",
+    "www.example.com",
+    "@someone",
+    "@someone @another https://example.com",
+])
+def test_links_and_mentions_are_neutral(text):
+    assert label(text) == 'NEUTRAL'
+
+
+@pytest.mark.parametrize("text", ["😂😂", "ok", "10/10", "", None])
+def test_no_signal_is_neutral(text):
+    assert label(text) == 'NEUTRAL'
+
+
+@pytest.mark.parametrize("text", [
+    "this video is great",
+    "wow 👍 amazing",
+    "@someone nice edit",
+    "check https://example.com first",
+])
+def test_signal_goes_to_model(text):
+    assert label(text) is None
+
+
+def test_labels_align_with_input():
+    texts = pd.Series(["👍", "great video", "👎", "@someone"], dtype=object)
+    assert list(_heuristic_labels(texts)) == ['POSITIVE', None, 'NEGATIVE', 'NEUTRAL']
@@ -0,0 +1,70 @@
+"""End-to-end checks of CommentProcessor on small raw comment files."""
+
+import json
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from processor import CommentProcessor
+
+
+def write_json_lines(path, comments):
+    path.write_text("".join(json.dumps(comment) + "\n" for comment in comments), encoding='utf-8')
+
+
+@pytest.fixture
+def raw_dir(tmp_path):
+    path = tmp_path / "raw"
+    path.mkdir()
+    return path
+
+
+def run_processor(tmp_path, raw_dir, output_name="cleaned.parquet"):
+    processor = CommentProcessor(
+        raw_dir=str(raw_dir),
+        output_path=str(tmp_path / output_name),
+        metadata_path=str(tmp_path / "missing_metadata.csv"),
+        log_dir=str(tmp_path / "logs"),
+        legacy_json_dir=None
+    )
+    processor.run()
+    return pd.read_parquet(tmp_path / output_name) if output_name.endswith('.parquet') \
+        else pd.read_csv(tmp_path / output_name, dtype=str)
+
+
+def test_json_comment_without_votes(tmp_path, raw_dir):
+    write_json_lines(raw_dir / "vid00000001.json", [
+        {"cid": "a", "text": "first comment", "votes": "1.2K", "replies": "3", "time": "1 day ago", "author": "@x"},
+        {"cid": "b", "text": "second comment", "time": "2 days ago", "author": "@y"},
+    ])
+    df = run_processor(tmp_path, raw_dir)
+    assert df['votes'].tolist() == ['1.2K', '0']
+    assert df['replies'].tolist() == ['3', '0']
+
+
+def test_json_integer_votes(tmp_path, raw_dir):
+    write_json_lines(raw_dir / "vid00000001.json", [
+        {"cid": "a", "text": "first comment", "votes": 5, "replies": 0},
+        {"cid": "b", "text": "second comment", "votes": "7", "replies": None},
+    ])
+    df = run_processor(tmp_path, raw_dir)
+    assert df['votes'].tolist() == ['5', '7']
+    assert df['replies'].tolist() == ['0', '0']
+
+
+def test_parquet_dataset_null_votes(tmp_path, raw_dir):
+    # Same layout as the collector: video_id comes from the partition directory
+    partition = raw_dir / "video_id=vid00000001"
+    partition.mkdir()
+    table = pa.Table.from_pylist([
+        {"cid": "a", "text": "first comment", "votes": "4", "replies": "1"},
+        {"cid": "b", "text": "second comment"},
+    ], schema=pa.schema([(col, pa.string()) for col in ('cid', 'text', 'votes', 'replies', 'time', 'author')]))
+    pq.write_table(table, partition / "comments.parquet")
+
+    df = run_processor(tmp_path, raw_dir)
+    assert df['video_id'].astype(str).tolist() == ['vid00000001', 'vid00000001']
+    assert df['votes'].tolist() == ['4', '0']
+    assert df['replies'].tolist() == ['1', '0']